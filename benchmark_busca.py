@@ -0,0 +1,268 @@
+import numpy as np
+from busca import (criar_buscador, BuscadorNumpy, ExportacaoNumpy, colunas_numpy, nome_colecao,
+                   chroma_db_dir_padrao, numpy_dir_padrao, shards_dir_padrao)
+from cache_embeddings import EmbeddingsComCache
+import argparse
+import json
+import os
+import resource
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configurações ---
+# Modelo e cache de embeddings (os mesmos de rag.py e periodicos.py)
+embedding_model_name = 'paraphrase-MiniLM-L6-v2'
+cache_dir = "./cache_embeddings"
+# Arquivo com o conjunto fixo de consultas (gerado na primeira execução)
+consultas_file = "./benchmark_consultas.json"
+# Composição do conjunto de consultas: títulos, trechos de títulos e todas as áreas
+n_titulos = 100
+n_trechos = 100
+semente = 42
+# Linhas geradas por vez no corpus sintético
+tamanho_bloco_sintetico = 100000
+
+
+def rss_mb():
+    """
+    Memória residente atual do processo, em MB (pico, se /proc não estiver disponível)
+    """
+    try:
+        with open('/proc/self/status', encoding='ascii') as arquivo:
+            for linha in arquivo:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentis(valores):
+    """
+    p50, p95 e p99 (em milissegundos) de uma lista de durações em segundos
+    """
+    p50, p95, p99 = np.percentile(np.asarray(valores) * 1000, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def gerar_consultas(numpy_dir):
+    """
+    Monta o conjunto fixo de consultas a partir dos títulos e áreas da exportação NumPy
+
+    Usa uma semente fixa: títulos completos, trechos de títulos (as duas primeiras
+    palavras) e todas as Áreas de Avaliação distintas.
+    """
+    titulos = np.load(os.path.join(numpy_dir, f"{colunas_numpy['Título']}.npy"), mmap_mode='r')
+    areas = np.load(os.path.join(numpy_dir, f"{colunas_numpy['Área de Avaliação']}.npy"), mmap_mode='r')
+    rng = np.random.default_rng(semente)
+    linhas = rng.choice(len(titulos), min(n_titulos + n_trechos, len(titulos)), replace=False)
+    escolhidos = [str(titulos[linha]) for linha in linhas]
+    consultas = escolhidos[:n_titulos]
+    consultas += [" ".join(titulo.split()[:2]) for titulo in escolhidos[n_titulos:]]
+    consultas += sorted(set(str(area) for area in areas))
+    return list(dict.fromkeys(consulta for consulta in consultas if consulta.strip()))
+
+
+def carregar_consultas(caminho, numpy_dir):
+    """
+    Lê o conjunto de consultas do arquivo, gerando e gravando na primeira vez
+    """
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    consultas = gerar_consultas(numpy_dir)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(consultas, arquivo, ensure_ascii=False, indent=0)
+    print(f"Conjunto de {len(consultas)} consultas salvo em '{caminho}'.")
+    return consultas
+
+
+def chave_resultado(resultado):
+    """
+    Identifica um documento do índice (um por ISSN e Área de Avaliação)
+    """
+    return resultado["ISSN"], resultado["Área de Avaliação"]
+
+
+def gabarito(numpy_dir, vetores, k):
+    """
+    Vizinhos exatos (força bruta sobre a matriz exportada) de cada consulta
+    """
+    exato = BuscadorNumpy(numpy_dir)
+    return [{chave_resultado(r) for r in resultados} for resultados in exato.buscar(vetores, k)]
+
+
+def medir_backend(backend, vetores, k, clientes, repeticoes, chroma_db_dir, numpy_dir, esperado=None,
+                  shards_dir=shards_dir_padrao):
+    """
+    Mede carga, memória, latência por consulta, vazão com clientes simultâneos e recall@k de um backend
+
+    Returns:
+        Dicionário com as métricas
+    """
+    rss_inicial = rss_mb()
+    inicio = time.perf_counter()
+    buscador = criar_buscador(backend, chroma_db_dir, numpy_dir, shards_dir)
+    metricas = {"carga_s": time.perf_counter() - inicio}
+
+    inicio = time.perf_counter()
+    primeiros = [buscador.buscar(vetor[None, :], k)[0] for vetor in vetores]
+    metricas["primeira_passagem_s"] = time.perf_counter() - inicio
+    metricas["rss_mb"] = rss_mb() - rss_inicial
+
+    if esperado is not None:
+        metricas[f"recall@{k}"] = float(np.mean([
+            len({chave_resultado(r) for r in obtidos} & exatos) / max(len(exatos), 1)
+            for obtidos, exatos in zip(primeiros, esperado)
+        ]))
+
+    duracoes = []
+    for _ in range(repeticoes):
+        for vetor in vetores:
+            inicio = time.perf_counter()
+            buscador.buscar(vetor[None, :], k)
+            duracoes.append(time.perf_counter() - inicio)
+    metricas["latencia"] = percentis(duracoes)
+
+    def consultar(vetor):
+        buscador.buscar(vetor[None, :], k)
+
+    metricas["qps"] = {}
+    for n in clientes:
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                list(executor.map(consultar, vetores))
+            metricas["qps"][n] = repeticoes * len(vetores) / (time.perf_counter() - inicio)
+    return metricas
+
+
+def gerar_corpus_sintetico(origem, destino, linhas, ruido=0.1, dtype='float32', chroma_dir=None):
+    """
+    Gera um corpus sintético com 'linhas' documentos a partir da exportação NumPy real
+
+    Cada documento copia os metadados de uma linha real sorteada (com ISSN e título
+    únicos) e recebe o vetor dessa linha com ruído gaussiano, mantendo a distribuição
+    dos embeddings reais. A matriz é escrita em blocos direto no disco, pelo mesmo
+    gravador da exportação do criar_embbendings_chroma.py. Com 'chroma_dir', o mesmo
+    corpus é gravado em uma coleção do ChromaDB.
+    """
+    base = BuscadorNumpy(origem)
+    escala = ruido * float(np.asarray(base.embeddings[:10000], dtype=np.float32).std())
+    rng = np.random.default_rng(semente)
+
+    temporario = destino + '.tmp'
+    if os.path.exists(temporario):
+        shutil.rmtree(temporario)
+    exportacao = ExportacaoNumpy(temporario, linhas, dtype, {**base.meta, 'sintetico': True})
+
+    colecao = None
+    if chroma_dir is not None:
+        import chromadb
+        if os.path.exists(chroma_dir):
+            shutil.rmtree(chroma_dir)
+        client = chromadb.PersistentClient(path=chroma_dir)
+        colecao = client.create_collection(name=nome_colecao, embedding_function=None)
+        tamanho_lote_chroma = min(5000, client.get_max_batch_size())
+
+    for inicio in range(0, linhas, tamanho_bloco_sintetico):
+        fim = min(inicio + tamanho_bloco_sintetico, linhas)
+        origens = rng.integers(len(base), size=fim - inicio)
+        vetores = np.asarray(base.embeddings[origens], dtype=np.float32)
+        vetores += rng.normal(scale=escala, size=vetores.shape).astype(np.float32)
+
+        metadatas, documentos = [], []
+        for numero, linha in enumerate(origens, inicio):
+            metadados = {chave: str(coluna[linha]) for chave, coluna in base.colunas.items()}
+            metadados["ISSN"] = f"S{numero:07d}"
+            metadados["Título"] += f" #{numero}"
+            documentos.append(metadados.pop("Texto Combinado"))
+            metadatas.append(metadados)
+        ids = [f"{metadados['ISSN']}|{metadados['Área de Avaliação']}" for metadados in metadatas]
+        exportacao.adicionar(vetores, metadatas, documentos, ids)
+
+        if colecao is not None:
+            for posicao in range(0, fim - inicio, tamanho_lote_chroma):
+                parte = slice(posicao, posicao + tamanho_lote_chroma)
+                colecao.upsert(ids=ids[parte], embeddings=vetores[parte], documents=documentos[parte],
+                               metadatas=metadatas[parte])
+        print(f"{fim}/{linhas} linhas sintéticas geradas.")
+
+    exportacao.finalizar()
+
+    if os.path.exists(destino):
+        shutil.rmtree(destino)
+    os.rename(temporario, destino)
+    print(f"Corpus sintético salvo em '{destino}'.")
+
+
+def imprimir(backend, metricas, k):
+    print(f"\nBackend '{backend}':")
+    print(f"  Carga do índice: {metricas['carga_s']:.3f}s | primeira passagem: {metricas['primeira_passagem_s']:.2f}s "
+          f"| memória residente: +{metricas['rss_mb']:.0f} MB")
+    if f"recall@{k}" in metricas:
+        print(f"  Recall@{k} (contra a busca exata): {metricas[f'recall@{k}']:.3f}")
+    latencia = metricas["latencia"]
+    print(f"  Latência por consulta: p50 {latencia['p50_ms']:.2f} ms | p95 {latencia['p95_ms']:.2f} ms "
+          f"| p99 {latencia['p99_ms']:.2f} ms")
+    print("  Vazão: " + " | ".join(f"{n} cliente(s) {qps:.0f} consultas/s" for n, qps in metricas["qps"].items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede latência, vazão, memória e recall@k dos backends de busca (sem acesso à rede).")
+    parser.add_argument('--backends', nargs='+', default=['chroma', 'numpy'], choices=['chroma', 'numpy', 'shards'])
+    parser.add_argument('--chroma-dir', default=chroma_db_dir_padrao, help=f"Diretório do ChromaDB (padrão: {chroma_db_dir_padrao}).")
+    parser.add_argument('--numpy-dir', default=numpy_dir_padrao,
+                        help=f"Exportação NumPy usada no backend numpy e como gabarito exato (padrão: {numpy_dir_padrao}).")
+    parser.add_argument('--shards-dir', default=shards_dir_padrao,
+                        help=f"Índice particionado usado no backend shards (padrão: {shards_dir_padrao}).")
+    parser.add_argument('--consultas', default=consultas_file, help=f"Conjunto fixo de consultas (padrão: {consultas_file}).")
+    parser.add_argument('-k', type=int, default=10, help="Resultados por consulta (padrão: 10).")
+    parser.add_argument('--clientes', type=int, nargs='+', default=[1, 4, 16],
+                        help="Quantidades de clientes simultâneos na medição de vazão (padrão: 1 4 16).")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Passagens pelo conjunto de consultas (padrão: 3).")
+    parser.add_argument('--json', default=None, help="Grava as métricas em JSON neste arquivo.")
+    parser.add_argument('--gerar-sintetico', type=int, default=None, metavar='LINHAS',
+                        help="Gera um corpus sintético com LINHAS documentos a partir de --numpy-dir e encerra.")
+    parser.add_argument('--destino-sintetico', default="./sucupira_sintetico",
+                        help="Diretório NumPy do corpus sintético (padrão: ./sucupira_sintetico).")
+    parser.add_argument('--chroma-sintetico', default=None,
+                        help="Grava também o corpus sintético em um ChromaDB neste diretório.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.numpy_dir):
+        print(f"Erro: exportação NumPy '{args.numpy_dir}' não encontrada. "
+              "Execute criar_embbendings_chroma.py --exportar-numpy antes.")
+        exit()
+
+    if args.gerar_sintetico:
+        # O destino é apagado e recriado; nunca pode ser o índice real
+        reais = {os.path.abspath(args.numpy_dir), os.path.abspath(args.chroma_dir)}
+        if {os.path.abspath(args.destino_sintetico), os.path.abspath(args.chroma_sintetico or args.destino_sintetico)} & reais:
+            print("Erro: o corpus sintético não pode ser gravado sobre o índice real.")
+            exit()
+        gerar_corpus_sintetico(args.numpy_dir, args.destino_sintetico, args.gerar_sintetico,
+                               chroma_dir=args.chroma_sintetico)
+        exit()
+
+    consultas = carregar_consultas(args.consultas, args.numpy_dir)
+    # Vetores das consultas vêm do cache de embeddings; o modelo só é carregado para consultas novas
+    vetores = EmbeddingsComCache(embedding_model_name, cache_dir).encode(consultas)
+    esperado = gabarito(args.numpy_dir, vetores, args.k)
+    print(f"{len(consultas)} consultas, k={args.k}, gabarito exato sobre '{args.numpy_dir}'.")
+
+    relatorio = {}
+    for backend in args.backends:
+        try:
+            relatorio[backend] = medir_backend(backend, vetores, args.k, args.clientes, args.repeticoes,
+                                               args.chroma_dir, args.numpy_dir, esperado, args.shards_dir)
+        except ValueError as e:
+            print(f"\nBackend '{backend}': {e}")
+            continue
+        imprimir(backend, relatorio[backend], args.k)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({"consultas": len(consultas), "k": args.k, "backends": relatorio}, arquivo, indent=2)
+        print(f"\nMétricas salvas em '{args.json}'.")
@@ -0,0 +1,753 @@
+import numpy as np
+from cache_consultas import normalizar_consulta, normalizar_issn
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+
+# --- Configurações ---
+# Coleção do ChromaDB gravada por criar_embbendings_chroma.py
+nome_colecao = 'langchain'
+# Diretórios padrão de cada backend
+chroma_db_dir_padrao = "./sucupira_chroma_db"
+numpy_dir_padrao = "./sucupira_numpy"
+shards_dir_padrao = "./sucupira_shards"
+indice_exato_padrao = "./sucupira_indice_exato.sqlite3"
+# Metadados exportados para o backend NumPy (chave do resultado -> arquivo .npy da coluna)
+colunas_numpy = {
+    "Título": "titulo",
+    "Área de Avaliação": "area",
+    "ISSN": "issn",
+    "Estrato": "estrato",
+    "Texto Combinado": "texto"
+}
+# Campos que podem ser usados como filtro (pré-filtragem pelo índice invertido)
+campos_filtro = ["Estrato", "Área de Avaliação"]
+# Campo do índice de filtros com os pares (área, estrato) de cada linha, usado quando os dois campos são filtrados
+campo_pares = "Par"
+# Separador dos valores de campos com várias áreas (índice com um documento por periódico)
+separador_valores = "; "
+# Linhas da matriz float16 convertidas para float32 por vez durante a busca
+tamanho_bloco_float16 = 65536
+# Formas de particionar o índice em shards: um por Área de Avaliação, ou pelo hash do ISSN (tamanhos parecidos)
+particoes_shards = ("area", "hash")
+# Máximo de shards consultados em paralelo por busca
+max_threads_shards = 8
+
+
+def montar_resultado(metadados, documento, score):
+    """
+    Monta o dicionário de resultado no formato usado por rag.py e periodicos.py
+    """
+    metadados = metadados or {}
+    return {
+        "Título": metadados.get("Título", "N/A"),
+        "Área de Avaliação": metadados.get("Área de Avaliação", "N/A"),
+        "ISSN": metadados.get("ISSN", "N/A"),
+        "Estrato": metadados.get("Estrato", "N/A"),
+        "Texto Combinado": documento,
+        "Score de Similaridade": float(score)
+    }
+
+
+def valores_campo(texto):
+    """
+    Separa os valores de um campo multivalorado (ex.: "MEDICINA I; MEDICINA II")
+    """
+    return [valor.strip() for valor in str(texto).split(separador_valores.strip()) if valor.strip()]
+
+
+def chave_multivalor(campo, valor):
+    """
+    Nome da chave booleana de metadado que marca um valor de campo multivalorado no ChromaDB
+    """
+    return f"{campo}={normalizar_consulta(valor)}"
+
+
+def pares_area_estrato(areas, estratos):
+    """
+    Devolve os pares (área, estrato) de uma linha
+
+    No índice com um documento por periódico, as áreas e os estratos ficam em campos
+    multivalorados alinhados por posição ("COMPUTAÇÃO; MEDICINA I" e "A1; B3").
+    Se as listas não tiverem o mesmo tamanho, cada área é combinada com todos os estratos.
+    """
+    areas, estratos = valores_campo(areas), valores_campo(estratos)
+    if len(areas) == len(estratos):
+        return list(zip(areas, estratos))
+    return [(area, estrato) for area in areas for estrato in estratos or [""]]
+
+
+def chave_par(area, estrato):
+    """
+    Valor do campo de pares (campo_pares) para uma área e um estrato
+    """
+    return f"{area}|{estrato}"
+
+
+def restringir_resultado(resultado, filtros):
+    """
+    Restringe as áreas e os estratos de um resultado aos pares que atendem aos filtros
+
+    Um periódico A1 em COMPUTAÇÃO e B3 em MEDICINA I não atende ao filtro Estrato A1
+    com Área MEDICINA I; com o filtro de MEDICINA I, ele aparece com a área
+    MEDICINA I e o estrato B3.
+
+    Returns:
+        O resultado com os campos restritos, ou None se nenhum par atender aos filtros
+    """
+    filtros = normalizar_filtros(filtros)
+    if not filtros:
+        return resultado
+    areas = {normalizar_consulta(valor) for valor in filtros.get("Área de Avaliação", [])}
+    estratos = {normalizar_consulta(valor) for valor in filtros.get("Estrato", [])}
+    pares = [
+        (area, estrato) for area, estrato in pares_area_estrato(resultado["Área de Avaliação"], resultado["Estrato"])
+        if (not areas or normalizar_consulta(area) in areas) and (not estratos or normalizar_consulta(estrato) in estratos)
+    ]
+    if not pares:
+        return None
+    return {
+        **resultado,
+        "Área de Avaliação": separador_valores.join(area for area, _ in pares),
+        "Estrato": separador_valores.join(estrato for _, estrato in pares)
+    }
+
+
+def restringir_resultados(resultados, filtros):
+    """
+    Aplica restringir_resultado a uma lista, descartando os resultados sem par válido
+    """
+    if not filtros:
+        return resultados
+    restritos = (restringir_resultado(resultado, filtros) for resultado in resultados)
+    return [resultado for resultado in restritos if resultado is not None]
+
+
+def normalizar_filtros(filtros):
+    """
+    Padroniza os filtros em {campo: [valores]}, descartando campos vazios
+
+    Args:
+        filtros (dict): Campo ("Estrato" ou "Área de Avaliação") -> valor ou lista de valores.
+            Valores do mesmo campo são combinados com OU; campos diferentes, com E.
+    """
+    normalizados = {}
+    for campo, valores in (filtros or {}).items():
+        if campo not in campos_filtro:
+            raise ValueError(f"Unknown filter field '{campo}' (use one of {campos_filtro})")
+        if isinstance(valores, str):
+            valores = [valores]
+        valores = [str(valor) for valor in (valores or []) if str(valor).strip()]
+        if valores:
+            normalizados[campo] = valores
+    return normalizados
+
+
+def chave_filtros(filtros):
+    """
+    Gera uma chave imutável (para caches) a partir dos filtros
+    """
+    return tuple(sorted(
+        (campo, tuple(sorted({normalizar_consulta(valor) for valor in valores})))
+        for campo, valores in normalizar_filtros(filtros).items()
+    ))
+
+
+def gravar_indice_filtros(diretorio, colunas):
+    """
+    Grava o índice invertido dos campos de filtro (valor -> bitmap das linhas)
+
+    Para cada campo são gravados 'filtros_<coluna>.npy', uma matriz com um bitmap
+    compactado (np.packbits) por valor distinto, e a lista de valores em 'filtros.json'.
+    Os pares (área, estrato) de cada linha têm o seu próprio índice, 'filtros_pares.npy'.
+
+    Args:
+        diretorio (str): Diretório do backend NumPy
+        colunas (dict): Chave do resultado -> lista (ou array) com o valor de cada linha
+    """
+    valores_por_campo = {}
+    for campo, bitmaps, valores in _montar_bitmaps(colunas):
+        np.save(os.path.join(diretorio, _arquivo_filtros(campo)), bitmaps)
+        valores_por_campo[campo] = valores
+    with open(os.path.join(diretorio, 'filtros.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(valores_por_campo, arquivo, ensure_ascii=False)
+
+
+def _arquivo_filtros(campo):
+    return f"filtros_{'pares' if campo == campo_pares else colunas_numpy[campo]}.npy"
+
+
+def _montar_bitmaps(colunas, campos=None):
+    for campo in campos or campos_filtro + [campo_pares]:
+        # Uma linha pode ter vários valores (índice com um documento por periódico)
+        if campo == campo_pares:
+            valores_linhas = [[chave_par(area, estrato) for area, estrato in pares_area_estrato(areas, estratos)]
+                              for areas, estratos in zip(colunas["Área de Avaliação"], colunas["Estrato"])]
+        else:
+            valores_linhas = [valores_campo(texto) for texto in colunas[campo]]
+        valores = sorted({valor for valores_linha in valores_linhas for valor in valores_linha})
+        posicoes = {valor: i for i, valor in enumerate(valores)}
+        mascaras = np.zeros((len(valores), len(valores_linhas)), dtype=bool)
+        for linha, valores_linha in enumerate(valores_linhas):
+            for valor in valores_linha:
+                mascaras[posicoes[valor], linha] = True
+        yield campo, np.packbits(mascaras, axis=1), valores
+
+
+class ExportacaoNumpy:
+    """
+    Grava, lote a lote, um diretório no formato do backend NumPy (BuscadorNumpy)
+
+    Usada pela exportação do criar_embbendings_chroma.py (inteira ou em shards) e pelo
+    corpus sintético do benchmark_busca.py. 'meta' é gravado em 'meta.json' junto com
+    a quantidade de linhas e o tipo da matriz.
+    """
+
+    def __init__(self, diretorio, total, dtype='float32', meta=None):
+        self.diretorio = diretorio
+        self.total = total
+        self.dtype = dtype
+        self.meta = meta or {}
+        self.linhas = 0
+        self.embeddings = None
+        self.normas = np.empty(total, dtype=np.float32)
+        self.colunas = {chave: [] for chave in colunas_numpy}
+        self.ids = []
+        os.makedirs(diretorio)
+
+    def adicionar(self, vetores, metadatas, documentos, ids):
+        vetores = np.asarray(vetores, dtype=np.float32)
+        if self.embeddings is None:
+            self.embeddings = np.lib.format.open_memmap(os.path.join(self.diretorio, 'embeddings.npy'), mode='w+',
+                                                        dtype=self.dtype, shape=(self.total, vetores.shape[1]))
+        inicio, fim = self.linhas, self.linhas + len(vetores)
+        self.embeddings[inicio:fim] = vetores
+        # A norma é calculada sobre o vetor já convertido, para ficar coerente com a matriz salva
+        convertidos = vetores.astype(self.dtype).astype(np.float32)
+        self.normas[inicio:fim] = np.einsum('ij,ij->i', convertidos, convertidos)
+        self.linhas = fim
+
+        for metadados, documento in zip(metadatas, documentos):
+            metadados = metadados or {}
+            for chave in colunas_numpy:
+                valor = documento if chave == "Texto Combinado" else metadados.get(chave, "N/A")
+                self.colunas[chave].append("" if valor is None else str(valor))
+        self.ids.extend(ids)
+
+    def finalizar(self):
+        if self.embeddings is not None:
+            self.embeddings.flush()
+            self.embeddings = None
+        else:
+            np.save(os.path.join(self.diretorio, 'embeddings.npy'), np.empty((0, 0), dtype=self.dtype))
+        np.save(os.path.join(self.diretorio, 'normas.npy'), self.normas[:self.linhas])
+        for chave, arquivo in colunas_numpy.items():
+            np.save(os.path.join(self.diretorio, f"{arquivo}.npy"), np.array(self.colunas[chave], dtype=str))
+        # IDs ordenados e a linha de cada um, para buscar documentos pelo ID (consultas exatas)
+        ids = np.array(self.ids, dtype=str)
+        ordem = np.argsort(ids, kind='stable')
+        np.save(os.path.join(self.diretorio, 'ids.npy'), ids[ordem])
+        np.save(os.path.join(self.diretorio, 'linhas_ids.npy'), ordem)
+        # Índice invertido de Estrato e Área de Avaliação usado na pré-filtragem das buscas
+        gravar_indice_filtros(self.diretorio, self.colunas)
+        with open(os.path.join(self.diretorio, 'meta.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump({**self.meta, 'linhas': self.linhas, 'dtype': self.dtype}, arquivo)
+
+
+class IndiceExato:
+    """
+    Índice de consultas exatas por ISSN ou pelo título do periódico
+
+    Gerado na construção do banco (criar_embbendings_chroma.py) e usado antes da
+    busca semântica. O arquivo SQLite guarda só a chave normalizada e o ID do
+    documento; os dados do periódico vêm do backend de busca (ver registros()),
+    então abrir o índice não carrega nada na memória.
+    """
+
+    def __init__(self, caminho=indice_exato_padrao):
+        if not os.path.exists(caminho):
+            raise ValueError(f"Exact-match index '{caminho}' not found")
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False)
+
+    @staticmethod
+    def gravar(lotes, caminho=indice_exato_padrao):
+        """
+        Grava o índice a partir de lotes de (IDs, metadados), um lote por vez
+
+        Returns:
+            Tupla (ISSNs distintos, títulos distintos)
+        """
+        temporario = caminho + '.tmp'
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        conexao = sqlite3.connect(temporario)
+        try:
+            with conexao:
+                conexao.execute("CREATE TABLE chaves (tipo TEXT NOT NULL, chave TEXT NOT NULL, id TEXT NOT NULL)")
+                for ids, metadatas in lotes:
+                    linhas = []
+                    for id_doc, metadados in zip(ids, metadatas):
+                        metadados = metadados or {}
+                        issn = normalizar_issn(metadados.get("ISSN", ""))
+                        if issn is not None:
+                            linhas.append(("issn", issn, id_doc))
+                        linhas.append(("titulo", normalizar_consulta(metadados.get("Título", "")), id_doc))
+                    conexao.executemany("INSERT INTO chaves (tipo, chave, id) VALUES (?, ?, ?)", linhas)
+                conexao.execute("CREATE INDEX chaves_tipo_chave ON chaves (tipo, chave)")
+            issns, titulos = (conexao.execute("SELECT COUNT(DISTINCT chave) FROM chaves WHERE tipo = ?", (tipo,)).fetchone()[0]
+                              for tipo in ("issn", "titulo"))
+        finally:
+            conexao.close()
+        os.replace(temporario, caminho)
+        return issns, titulos
+
+    def ids(self, consulta):
+        """
+        Devolve os IDs dos documentos cujo ISSN ou título normalizado é igual à consulta
+        """
+        issn = normalizar_issn(consulta)
+        tipo, chave = ("issn", issn) if issn is not None else ("titulo", normalizar_consulta(consulta))
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT id FROM chaves WHERE tipo = ? AND chave = ? ORDER BY rowid", (tipo, chave)
+            ).fetchall()
+        return [linha[0] for linha in linhas]
+
+    def buscar(self, consulta, buscador, k=None, filtros=None):
+        """
+        Procura a consulta como ISSN ou título exato (ignorando caixa, acentos e espaços)
+
+        Args:
+            consulta (str): ISSN ou título
+            buscador: Backend de busca de onde vêm os dados dos documentos encontrados
+
+        Returns:
+            Lista de resultados com score 0.0, vazia se não houver correspondência exata
+        """
+        ids = self.ids(consulta)
+        resultados = restringir_resultados(buscador.registros(ids), filtros) if ids else []
+        return resultados[:k] if k else resultados
+
+
+def completar_com_exatos(exatos, similares, k):
+    """
+    Põe os resultados exatos (título do periódico) na frente e completa até k com os da busca semântica
+    """
+    vistos = {(resultado["ISSN"], resultado["Área de Avaliação"]) for resultado in exatos}
+    restantes = [resultado for resultado in similares if (resultado["ISSN"], resultado["Área de Avaliação"]) not in vistos]
+    return (exatos + restantes)[:k]
+
+
+class BuscadorChroma:
+    """
+    Busca aproximada (HNSW) na coleção do ChromaDB
+    """
+
+    def __init__(self, chroma_db_dir=chroma_db_dir_padrao):
+        if not os.path.exists(chroma_db_dir):
+            raise ValueError(f"Database directory '{chroma_db_dir}' not found")
+        # Importado aqui: o ChromaDB é pesado e só é necessário no backend "chroma"
+        import chromadb
+        client = chromadb.PersistentClient(path=chroma_db_dir)
+        # Os vetores das consultas são calculados fora do ChromaDB
+        self.collection = client.get_collection(name=nome_colecao, embedding_function=None)
+        # Coleção com um documento por periódico: áreas e estratos ficam em campos multivalorados
+        self.por_periodico = bool((self.collection.metadata or {}).get("por_periodico"))
+        # Coleções gravadas antes das chaves de par (área, estrato) são filtradas campo a campo
+        self.pares = bool((self.collection.metadata or {}).get("pares_area_estrato"))
+        # Valores distintos dos campos de filtro, gravados pelo criar_embbendings_chroma.py junto com a coleção
+        self._valores_filtro = None
+        valores_gravados = (self.collection.metadata or {}).get("valores_filtro")
+        if valores_gravados:
+            self._valores_filtro = {nome: {normalizar_consulta(valor): valor for valor in valores}
+                                    for nome, valores in json.loads(valores_gravados).items()}
+
+    def _resolver_valores(self, campo, valores):
+        """
+        Converte os valores do filtro para a grafia gravada na coleção (o filtro do ChromaDB é exato)
+
+        Coleções gravadas sem a lista de valores são percorridas uma vez, no primeiro filtro.
+        """
+        if self._valores_filtro is None:
+            self._valores_filtro = {nome: {} for nome in campos_filtro}
+            total = self.collection.count()
+            for inicio in range(0, total, 5000):
+                lote = self.collection.get(include=['metadatas'], limit=5000, offset=inicio)
+                for metadados in lote['metadatas']:
+                    for nome in campos_filtro:
+                        valor = (metadados or {}).get(nome)
+                        if valor is not None:
+                            self._valores_filtro[nome][normalizar_consulta(valor)] = valor
+        return [self._valores_filtro.get(campo, {}).get(normalizar_consulta(valor), valor) for valor in valores]
+
+    def _condicao(self, campo, valores):
+        if not self.por_periodico:
+            return {campo: {"$in": self._resolver_valores(campo, valores)}}
+        # Campos multivalorados são filtrados pelas chaves booleanas gravadas em cada documento
+        condicoes = [{chave_multivalor(campo, valor): True} for valor in valores]
+        return condicoes[0] if len(condicoes) == 1 else {"$or": condicoes}
+
+    def _where(self, filtros):
+        filtros = normalizar_filtros(filtros)
+        if self.por_periodico and self.pares and len(filtros) == len(campos_filtro):
+            # Área e estrato filtrados juntos: a combinação tem de existir no mesmo par do periódico
+            condicoes = [{chave_multivalor(campo_pares, chave_par(area, estrato)): True}
+                         for area in filtros["Área de Avaliação"] for estrato in filtros["Estrato"]]
+            return condicoes[0] if len(condicoes) == 1 else {"$or": condicoes}
+        condicoes = [self._condicao(campo, valores) for campo, valores in filtros.items()]
+        if not condicoes:
+            return None
+        return condicoes[0] if len(condicoes) == 1 else {"$and": condicoes}
+
+    def registros(self, ids):
+        """
+        Devolve os documentos com esses IDs (score 0.0), na ordem pedida
+        """
+        if not ids:
+            return []
+        lote = self.collection.get(ids=list(ids), include=['metadatas', 'documents'])
+        por_id = {id_doc: montar_resultado(metadados, documento, 0.0)
+                  for id_doc, metadados, documento in zip(lote['ids'], lote['metadatas'], lote['documents'])}
+        return [por_id[id_doc] for id_doc in ids if id_doc in por_id]
+
+    def buscar(self, vetores, k=10, filtros=None):
+        """
+        Busca os k documentos mais próximos de cada vetor de consulta
+
+        Args:
+            vetores: Matriz (ou lista) com um embedding de consulta por linha
+            k (int): Número de resultados por consulta
+            filtros (dict): Filtros opcionais por Estrato e Área de Avaliação (ver normalizar_filtros)
+
+        Returns:
+            Lista com uma lista de resultados por consulta, do mais ao menos similar
+        """
+        vetores = np.atleast_2d(np.asarray(vetores, dtype=np.float32))
+        results = self.collection.query(
+            query_embeddings=vetores,
+            n_results=k,
+            where=self._where(filtros),
+            include=['metadatas', 'documents', 'distances']
+        )
+        return [
+            restringir_resultados(
+                [montar_resultado(metadados, documento, score) for metadados, documento, score
+                 in zip(results['metadatas'][i], results['documents'][i], results['distances'][i])],
+                filtros
+            )
+            for i in range(len(vetores))
+        ]
+
+
+class BuscadorNumpy:
+    """
+    Busca exata (força bruta) sobre a matriz de embeddings exportada em .npy
+
+    A matriz e as colunas de metadados são abertas por memory-map, então o
+    carregamento é praticamente instantâneo e o cache de páginas do sistema
+    operacional é compartilhado entre processos. O score é a distância L2 ao
+    quadrado, a mesma devolvida pelo ChromaDB.
+    """
+
+    def __init__(self, numpy_dir=numpy_dir_padrao):
+        if not os.path.exists(numpy_dir):
+            raise ValueError(f"Index directory '{numpy_dir}' not found")
+        with open(os.path.join(numpy_dir, 'meta.json'), encoding='utf-8') as arquivo:
+            self.meta = json.load(arquivo)
+        self.embeddings = np.load(os.path.join(numpy_dir, 'embeddings.npy'), mmap_mode='r')
+        # Norma ao quadrado de cada linha, calculada na exportação
+        self.normas = np.load(os.path.join(numpy_dir, 'normas.npy'), mmap_mode='r')
+        self.colunas = {
+            chave: np.load(os.path.join(numpy_dir, f"{arquivo}.npy"), mmap_mode='r')
+            for chave, arquivo in colunas_numpy.items()
+        }
+        self.indice_filtros = self._carregar_indice_filtros(numpy_dir)
+        # IDs dos documentos em ordem alfabética e a linha de cada um, usados por registros()
+        self.ids = self.linhas_ids = None
+        if os.path.exists(os.path.join(numpy_dir, 'ids.npy')):
+            self.ids = np.load(os.path.join(numpy_dir, 'ids.npy'), mmap_mode='r')
+            self.linhas_ids = np.load(os.path.join(numpy_dir, 'linhas_ids.npy'), mmap_mode='r')
+
+    def _carregar_indice_filtros(self, numpy_dir):
+        """
+        Carrega o índice invertido dos filtros (gerado na exportação, ou montado agora se ausente)
+
+        Returns:
+            Dicionário campo -> (valor normalizado -> linha do bitmap, matriz de bitmaps)
+        """
+        caminho = os.path.join(numpy_dir, 'filtros.json')
+        if os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as arquivo:
+                valores_por_campo = json.load(arquivo)
+            montados = (
+                (campo, np.load(os.path.join(numpy_dir, _arquivo_filtros(campo)), mmap_mode='r'), valores)
+                for campo, valores in valores_por_campo.items()
+            )
+            if campo_pares not in valores_por_campo:
+                # Exportação anterior ao índice de pares: os pares são montados agora
+                montados = itertools.chain(montados, _montar_bitmaps(self.colunas, [campo_pares]))
+        else:
+            montados = _montar_bitmaps(self.colunas)
+        return {
+            campo: ({normalizar_consulta(valor): i for i, valor in enumerate(valores)}, bitmaps)
+            for campo, bitmaps, valores in montados
+        }
+
+    def candidatos(self, filtros):
+        """
+        Devolve as linhas que atendem aos filtros, combinando os bitmaps do índice invertido
+
+        Returns:
+            Array com as linhas candidatas, ou None se não houver filtros
+        """
+        filtros = normalizar_filtros(filtros)
+        if len(filtros) == len(campos_filtro):
+            # Área e estrato filtrados juntos: a combinação tem de existir no mesmo par da linha
+            filtros = {campo_pares: [chave_par(area, estrato)
+                                     for area in filtros["Área de Avaliação"] for estrato in filtros["Estrato"]]}
+        mascara = None
+        for campo, valores in filtros.items():
+            posicoes, bitmaps = self.indice_filtros[campo]
+            bits = np.zeros(bitmaps.shape[1], dtype=np.uint8)
+            for valor in valores:
+                posicao = posicoes.get(normalizar_consulta(valor))
+                if posicao is not None:
+                    bits |= bitmaps[posicao]
+            mascara = bits if mascara is None else mascara & bits
+        if mascara is None:
+            return None
+        return np.flatnonzero(np.unpackbits(mascara, count=len(self)))
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    def _produtos(self, vetores, linhas=None):
+        """
+        Calcula o produto escalar de cada consulta com as linhas da matriz (todas, ou só 'linhas')
+        """
+        total = len(self) if linhas is None else len(linhas)
+        if self.embeddings.dtype == np.float32:
+            matriz = self.embeddings if linhas is None else self.embeddings[linhas]
+            return vetores @ matriz.T
+        # float16: converte a matriz em blocos para não duplicar o uso de memória
+        produtos = np.empty((len(vetores), total), dtype=np.float32)
+        for inicio in range(0, total, tamanho_bloco_float16):
+            fim = inicio + tamanho_bloco_float16
+            bloco = self.embeddings[inicio:fim] if linhas is None else self.embeddings[linhas[inicio:fim]]
+            produtos[:, inicio:inicio + len(bloco)] = vetores @ np.asarray(bloco, dtype=np.float32).T
+        return produtos
+
+    def distancias(self, vetores, linhas=None):
+        """
+        Devolve a distância L2 ao quadrado de cada consulta às linhas da matriz (todas, ou só 'linhas')
+        """
+        vetores = np.atleast_2d(np.asarray(vetores, dtype=np.float32))
+        distancias = self._produtos(vetores, linhas)
+        distancias *= -2
+        distancias += self.normas if linhas is None else self.normas[linhas]
+        distancias += np.einsum('ij,ij->i', vetores, vetores)[:, None]
+        return distancias
+
+    def linhas_mais_proximas(self, distancias, k):
+        """
+        Seleciona as k menores distâncias de cada consulta com argpartition
+
+        Returns:
+            Lista de arrays com as linhas selecionadas, ordenadas da mais à menos similar
+        """
+        k = min(k, distancias.shape[1])
+        if k <= 0:
+            return [np.empty(0, dtype=np.int64) for _ in range(len(distancias))]
+        candidatas = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        ordem = np.take_along_axis(distancias, candidatas, axis=1).argsort(axis=1)
+        return list(np.take_along_axis(candidatas, ordem, axis=1))
+
+    def registros(self, ids):
+        """
+        Devolve os documentos com esses IDs (score 0.0), na ordem pedida
+
+        Cada ID é localizado por busca binária na lista ordenada, sem montar um dicionário na memória.
+        """
+        if self.ids is None or not len(self.ids):
+            return []
+        resultados = []
+        for id_doc in ids:
+            posicao = int(np.searchsorted(self.ids, id_doc))
+            if posicao < len(self.ids) and self.ids[posicao] == id_doc:
+                resultados.append(self.resultado(self.linhas_ids[posicao], 0.0))
+        return resultados
+
+    def resultado(self, linha, score):
+        """
+        Monta o resultado de uma linha da matriz a partir das colunas de metadados
+        """
+        return {
+            **{chave: str(coluna[linha]) for chave, coluna in self.colunas.items()},
+            "Score de Similaridade": float(score)
+        }
+
+    def buscar(self, vetores, k=10, filtros=None):
+        """
+        Busca os k documentos mais próximos de cada vetor de consulta
+
+        Com filtros, a distância só é calculada para as linhas candidatas do índice
+        invertido, então consultas filtradas custam menos que as sem filtro.
+
+        Args:
+            vetores: Matriz (ou lista) com um embedding de consulta por linha
+            k (int): Número de resultados por consulta
+            filtros (dict): Filtros opcionais por Estrato e Área de Avaliação (ver normalizar_filtros)
+
+        Returns:
+            Lista com uma lista de resultados por consulta, do mais ao menos similar
+        """
+        linhas = self.candidatos(filtros)
+        distancias = self.distancias(vetores, linhas)
+        resultados = []
+        for posicoes, distancias_consulta in zip(self.linhas_mais_proximas(distancias, k), distancias):
+            selecionadas = posicoes if linhas is None else linhas[posicoes]
+            resultados.append(restringir_resultados(
+                [self.resultado(linha, distancias_consulta[posicao]) for linha, posicao in zip(selecionadas, posicoes)],
+                filtros
+            ))
+        return resultados
+
+
+def nome_shard_area(area):
+    """
+    Nome do shard (e do seu diretório) de uma Área de Avaliação
+    """
+    return "area_" + re.sub(r'[^0-9a-z]+', '_', normalizar_consulta(area)).strip('_')
+
+
+def shards_da_linha(metadados, particao="area", num_shards=16):
+    """
+    Devolve os shards em que uma linha do índice é gravada
+
+    Na partição por área, um documento com várias áreas (índice com um documento por
+    periódico) é gravado no shard de cada uma. Na partição por hash, as linhas do
+    mesmo ISSN ficam sempre no mesmo shard.
+    """
+    if particao == "area":
+        return [nome_shard_area(area) for area in valores_campo(metadados.get("Área de Avaliação", "N/A"))] or ["area_na"]
+    if particao == "hash":
+        chave = normalizar_issn(metadados.get("ISSN", "")) or str(metadados.get("Título", ""))
+        posicao = int.from_bytes(hashlib.sha1(chave.encode('utf-8')).digest()[:8], 'big') % num_shards
+        return [f"hash_{posicao:03d}"]
+    raise ValueError(f"Unknown shard partition '{particao}' (use one of {particoes_shards})")
+
+
+class BuscadorShards:
+    """
+    Busca exata sobre o índice particionado em shards (um diretório do BuscadorNumpy por shard)
+
+    Cada consulta é enviada em paralelo aos shards relevantes e os k melhores de cada
+    um são combinados com um heap. Na partição por área, uma busca filtrada por Área de
+    Avaliação só lê os shards dessas áreas. As matrizes de todos os shards são abertas
+    por memory-map, então só as páginas dos shards consultados ocupam memória.
+    """
+
+    def __init__(self, shards_dir=shards_dir_padrao, max_threads=max_threads_shards):
+        if not os.path.exists(shards_dir):
+            raise ValueError(f"Shards directory '{shards_dir}' not found")
+        with open(os.path.join(shards_dir, 'shards.json'), encoding='utf-8') as arquivo:
+            self.meta = json.load(arquivo)
+        self.particao = self.meta["particao"]
+        self.shards = {nome: BuscadorNumpy(os.path.join(shards_dir, nome)) for nome in self.meta["shards"]}
+        # Os produtos de matrizes do NumPy liberam o GIL, então os shards rodam de fato em paralelo
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(max_threads, len(self.shards))),
+                                           thread_name_prefix="shard")
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards.values())
+
+    def registros(self, ids):
+        """
+        Devolve os documentos com esses IDs (score 0.0), na ordem pedida
+
+        Um documento com várias áreas está em mais de um shard e só é devolvido uma vez.
+        """
+        resultados = []
+        for id_doc in ids:
+            for shard in self.shards.values():
+                encontrados = shard.registros([id_doc])
+                if encontrados:
+                    resultados.extend(encontrados)
+                    break
+        return resultados
+
+    def shards_consultados(self, filtros):
+        """
+        Seleciona os shards que podem ter resultados para os filtros
+        """
+        areas = normalizar_filtros(filtros).get("Área de Avaliação")
+        if self.particao != "area" or not areas:
+            return list(self.shards)
+        return [nome for nome in dict.fromkeys(nome_shard_area(area) for area in areas) if nome in self.shards]
+
+    def buscar(self, vetores, k=10, filtros=None):
+        """
+        Busca os k documentos mais próximos de cada vetor de consulta
+
+        Args:
+            vetores: Matriz (ou lista) com um embedding de consulta por linha
+            k (int): Número de resultados por consulta
+            filtros (dict): Filtros opcionais por Estrato e Área de Avaliação (ver normalizar_filtros)
+
+        Returns:
+            Lista com uma lista de resultados por consulta, do mais ao menos similar
+        """
+        vetores = np.atleast_2d(np.asarray(vetores, dtype=np.float32))
+        nomes = self.shards_consultados(filtros)
+        if len(nomes) == 1:
+            return self.shards[nomes[0]].buscar(vetores, k, filtros)
+        por_shard = list(self.executor.map(lambda nome: self.shards[nome].buscar(vetores, k, filtros), nomes))
+
+        resultados = []
+        for i in range(len(vetores)):
+            # As listas de cada shard já vêm ordenadas: o heap as intercala e para nos k primeiros.
+            # Um documento com várias áreas aparece em mais de um shard e só entra uma vez.
+            vistos = set()
+            combinados = []
+            for resultado in heapq.merge(*(lista[i] for lista in por_shard),
+                                         key=lambda resultado: resultado["Score de Similaridade"]):
+                chave = tuple(resultado[campo] for campo in colunas_numpy)
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+                combinados.append(resultado)
+                if len(combinados) == k:
+                    break
+            resultados.append(combinados)
+        return resultados
+
+
+def criar_buscador(backend="chroma", chroma_db_dir=chroma_db_dir_padrao, numpy_dir=numpy_dir_padrao,
+                   shards_dir=shards_dir_padrao):
+    """
+    Cria o backend de busca escolhido na configuração
+
+    Args:
+        backend (str): "chroma" (índice HNSW do ChromaDB), "numpy" (busca exata em memory-map)
+            ou "shards" (busca exata no índice particionado, em paralelo)
+        chroma_db_dir (str): Diretório do ChromaDB
+        numpy_dir (str): Diretório exportado por criar_embbendings_chroma.py --exportar-numpy
+        shards_dir (str): Diretório exportado por criar_embbendings_chroma.py --exportar-shards
+
+    Returns:
+        Objeto com o método buscar(vetores, k)
+    """
+    if backend == "chroma":
+        return BuscadorChroma(chroma_db_dir)
+    if backend == "numpy":
+        return BuscadorNumpy(numpy_dir)
+    if backend == "shards":
+        return BuscadorShards(shards_dir)
+    raise ValueError(f"Unknown search backend '{backend}' (use 'chroma', 'numpy' or 'shards')")
@@ -0,0 +1,94 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalizar_consulta(texto):
+    """
+    Normaliza uma consulta para uso como chave de cache
+
+    Ignora maiúsculas/minúsculas, acentos e espaços extras, de modo que
+    "Computação", "computacao " e "COMPUTAÇÃO" geram a mesma chave.
+    """
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', texto).strip().casefold()
+
+
+def normalizar_issn(texto):
+    """
+    Devolve o ISSN normalizado (8 caracteres, sem hífen) ou None se o texto não tiver formato de ISSN
+    """
+    encontrado = re.fullmatch(r'\s*(\d{4})\s*-?\s*(\d{3}[\dXx])\s*', str(texto))
+    if encontrado is None:
+        return None
+    return (encontrado.group(1) + encontrado.group(2)).upper()
+
+
+class CacheLRU:
+    """
+    Cache em memória com descarte LRU por quantidade de itens e expiração por tempo (TTL)
+
+    Guarda contadores de acertos e faltas para medir o aproveitamento do cache.
+    """
+
+    def __init__(self, max_itens=256, ttl=600.0):
+        """
+        Args:
+            max_itens (int): Quantidade máxima de itens guardados
+            ttl (float): Segundos até um item expirar (None = nunca expira)
+        """
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.acertos = 0
+        self.faltas = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, chave, padrao=None):
+        """
+        Devolve o valor guardado para a chave, ou 'padrao' se ausente ou expirado
+        """
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None:
+                valor, expira_em = item
+                if expira_em is None or expira_em > time.monotonic():
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._itens[chave]
+            self.faltas += 1
+            return padrao
+
+    def guardar(self, chave, valor):
+        """
+        Guarda o valor, descartando os itens usados há mais tempo se o cache estiver cheio
+        """
+        expira_em = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._trava:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        """
+        Devolve os contadores do cache (itens, acertos, faltas e taxa de acerto)
+        """
+        total = self.acertos + self.faltas
+        return {
+            "itens": len(self._itens),
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / total if total else 0.0
+        }
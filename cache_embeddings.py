@@ -0,0 +1,202 @@
+import numpy as np
+from codificador import carregar_codificador, nome_cache
+from instrumentacao import span, contar
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from contextlib import contextmanager
+
+try:
+    import fcntl  # Trava entre processos (disponível em Linux e macOS)
+except ImportError:
+    fcntl = None
+
+# --- Configurações ---
+# Diretório padrão do cache em disco (um subdiretório por modelo)
+diretorio_cache_padrao = "./cache_embeddings"
+
+
+def normalizar_texto(texto):
+    """
+    Normaliza o texto antes de calcular a chave do cache (Unicode NFC e espaços)
+    """
+    texto = unicodedata.normalize('NFC', str(texto))
+    return re.sub(r'\s+', ' ', texto).strip()
+
+
+def hash_texto(texto):
+    """
+    Gera a chave do cache para um texto (SHA-1 do texto normalizado)
+    """
+    return hashlib.sha1(normalizar_texto(texto).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache persistente de embeddings endereçado pelo conteúdo do texto
+
+    Os vetores ficam em um arquivo binário float32 lido por memory-map e o
+    índice (hash do texto -> linha da matriz) em um arquivo texto ao lado.
+    Ambos só crescem por anexação, então vários processos podem compartilhar o
+    mesmo cache: scripts de construção, experimentos e consultas do agente.
+    """
+
+    def __init__(self, model_name, diretorio=diretorio_cache_padrao):
+        self.model_name = model_name
+        self.diretorio = os.path.join(diretorio, re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name))
+        os.makedirs(self.diretorio, exist_ok=True)
+
+        self._caminho_vetores = os.path.join(self.diretorio, 'vetores.f32')
+        self._caminho_indice = os.path.join(self.diretorio, 'indice.txt')
+        self._caminho_meta = os.path.join(self.diretorio, 'meta.json')
+        self._caminho_trava = os.path.join(self.diretorio, '.trava')
+
+        self._linhas = {}
+        self._posicao_indice = 0
+        self._matriz = None
+        self.dimensao = self._ler_dimensao()
+        self.acertos = 0
+        self.faltas = 0
+        self._sincronizar()
+
+    def __len__(self):
+        return len(self._linhas)
+
+    def obter(self, textos, funcao_encode):
+        """
+        Devolve os embeddings dos textos, codificando apenas os que não estão no cache
+
+        Args:
+            textos (list): Textos a serem codificados
+            funcao_encode: Função que recebe uma lista de textos e devolve a matriz de embeddings
+
+        Returns:
+            Matriz numpy (float32) com um embedding por texto, na mesma ordem
+        """
+        hashes = [hash_texto(texto) for texto in textos]
+
+        faltantes = {}
+        for chave, texto in zip(hashes, textos):
+            if chave not in self._linhas and chave not in faltantes:
+                faltantes[chave] = normalizar_texto(texto)
+
+        if faltantes:
+            # Outro processo pode ter gravado esses textos desde a última leitura do índice
+            self._sincronizar()
+            faltantes = {chave: texto for chave, texto in faltantes.items() if chave not in self._linhas}
+
+        self.faltas += len(faltantes)
+        self.acertos += len(textos) - len(faltantes)
+        contar("embeddings.cache_acertos", len(textos) - len(faltantes))
+        contar("embeddings.cache_faltas", len(faltantes))
+
+        if faltantes:
+            with span("codificador.modelo", textos=len(faltantes)):
+                novos = np.asarray(funcao_encode(list(faltantes.values())), dtype=np.float32)
+            self._anexar(list(faltantes.keys()), novos)
+
+        if not textos:
+            return np.empty((0, self.dimensao or 0), dtype=np.float32)
+        return np.array(self._vetores()[[self._linhas[chave] for chave in hashes]])
+
+    def _ler_dimensao(self):
+        if not os.path.exists(self._caminho_meta):
+            return None
+        with open(self._caminho_meta, encoding='utf-8') as arquivo:
+            return json.load(arquivo)['dimensao']
+
+    @contextmanager
+    def _trava(self):
+        with open(self._caminho_trava, 'a') as arquivo:
+            if fcntl is not None:
+                fcntl.flock(arquivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+    def _sincronizar(self):
+        """
+        Lê as entradas do índice gravadas desde a última leitura (inclusive por outros processos)
+        """
+        if not os.path.exists(self._caminho_indice):
+            return
+        with open(self._caminho_indice, 'rb') as arquivo:
+            arquivo.seek(self._posicao_indice)
+            for linha in arquivo:
+                if not linha.endswith(b'\n'):
+                    break  # Linha ainda sendo escrita por outro processo
+                self._posicao_indice += len(linha)
+                # Linhas malformadas (ex.: restos de uma gravação interrompida em versões antigas) são ignoradas
+                try:
+                    chave, numero = linha.decode('ascii').split()
+                except (UnicodeDecodeError, ValueError):
+                    continue
+                if len(chave) == 40 and numero.isdigit():
+                    self._linhas[chave] = int(numero)
+        if self.dimensao is None:
+            self.dimensao = self._ler_dimensao()
+
+    def _anexar(self, chaves, vetores):
+        with self._trava():
+            self._sincronizar()
+            # Com a trava, ninguém mais está escrevendo: um final de índice sem '\n' é uma gravação
+            # interrompida e é removido, para que a próxima entrada não seja anexada ao fragmento
+            if os.path.exists(self._caminho_indice) and os.path.getsize(self._caminho_indice) > self._posicao_indice:
+                os.truncate(self._caminho_indice, self._posicao_indice)
+            if self.dimensao is None:
+                self.dimensao = int(vetores.shape[1])
+                with open(self._caminho_meta, 'w', encoding='utf-8') as arquivo:
+                    json.dump({'modelo': self.model_name, 'dimensao': self.dimensao}, arquivo)
+
+            # Os novos vetores começam logo após a última linha do índice: vetores de uma
+            # gravação interrompida (sem entrada no índice) são descartados
+            tamanho_linha = self.dimensao * 4
+            with open(self._caminho_vetores, 'ab') as arquivo:
+                primeira = max(self._linhas.values(), default=-1) + 1
+                arquivo.truncate(primeira * tamanho_linha)
+                arquivo.write(np.ascontiguousarray(vetores, dtype=np.float32).tobytes())
+
+            with open(self._caminho_indice, 'a', encoding='ascii') as arquivo:
+                arquivo.writelines(f"{chave} {primeira + i}\n" for i, chave in enumerate(chaves))
+            self._sincronizar()
+
+    def _vetores(self):
+        linhas = os.path.getsize(self._caminho_vetores) // (self.dimensao * 4)
+        if self._matriz is None or self._matriz.shape[0] < linhas:
+            self._matriz = np.memmap(self._caminho_vetores, dtype=np.float32, mode='r',
+                                     shape=(linhas, self.dimensao))
+        return self._matriz
+
+
+class EmbeddingsComCache:
+    """
+    Codificador que consulta o EmbeddingCache antes do modelo
+
+    O SentenceTransformer só é carregado quando algum texto não está no cache.
+    Com modo="int8", usa o modelo quantizado (ver codificador.py).
+    """
+
+    def __init__(self, model_name, diretorio=diretorio_cache_padrao, modo="float"):
+        self.model_name = model_name
+        self.modo = modo
+        self.cache = EmbeddingCache(nome_cache(model_name, modo), diretorio)
+        self._model = None
+        # O carregamento em segundo plano e a primeira consulta podem pedir o modelo ao mesmo tempo
+        self._trava_model = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._trava_model:
+                if self._model is None:
+                    self._model = carregar_codificador(self.model_name, self.modo)
+        return self._model
+
+    def encode(self, textos):
+        with span("codificador", textos=len(textos)):
+            return self.cache.obter(textos, lambda faltantes: self.model.encode(faltantes))
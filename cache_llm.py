@@ -0,0 +1,165 @@
+from instrumentacao import span, contar
+import instrumentacao
+import functools
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# --- Configurações ---
+# Arquivo SQLite do cache de respostas do LLM
+cache_llm_padrao = "./cache_llm.sqlite3"
+# Tamanho máximo das respostas guardadas (bytes); as usadas há mais tempo são descartadas
+tamanho_maximo_padrao = 64 * 1024 * 1024
+
+
+def chave_chamada(model, messages, temperature=None, tools=None, stop=None):
+    """
+    Gera a chave do cache para uma chamada ao LLM (SHA-256 do modelo, mensagens, temperatura, ferramentas e stop)
+    """
+    conteudo = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "tools": tools, "stop": stop},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+class CacheRespostas:
+    """
+    Cache persistente (SQLite) das respostas do LLM, com descarte LRU por tamanho total
+    """
+
+    def __init__(self, caminho=cache_llm_padrao, tamanho_maximo=tamanho_maximo_padrao):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self.acertos = 0
+        self.faltas = 0
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        with self._trava, self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS respostas ("
+                " chave TEXT PRIMARY KEY,"
+                " resposta TEXT NOT NULL,"
+                " tamanho INTEGER NOT NULL,"
+                " usado_em REAL NOT NULL)"
+            )
+
+    def obter(self, chave):
+        """
+        Devolve a resposta guardada para a chave, ou None se ausente
+        """
+        with self._trava, self._conexao:
+            linha = self._conexao.execute("SELECT resposta FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                self.faltas += 1
+                return None
+            self._conexao.execute("UPDATE respostas SET usado_em = ? WHERE chave = ?", (time.time(), chave))
+            self.acertos += 1
+            return linha[0]
+
+    def guardar(self, chave, resposta):
+        """
+        Guarda a resposta, descartando as usadas há mais tempo se o cache passar do tamanho máximo
+        """
+        tamanho = len(resposta.encode('utf-8'))
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas (chave, resposta, tamanho, usado_em) VALUES (?, ?, ?, ?)",
+                (chave, resposta, tamanho, time.time())
+            )
+            total, = self._conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()
+            if total > self.tamanho_maximo:
+                antigas = self._conexao.execute(
+                    "SELECT chave, tamanho FROM respostas WHERE chave != ? ORDER BY usado_em", (chave,)
+                )
+                descartar = []
+                for antiga, tamanho_antiga in antigas:
+                    if total <= self.tamanho_maximo:
+                        break
+                    descartar.append((antiga,))
+                    total -= tamanho_antiga
+                self._conexao.executemany("DELETE FROM respostas WHERE chave = ?", descartar)
+
+    def estatisticas(self):
+        """
+        Devolve os contadores do cache (itens, bytes, acertos, faltas e taxa de acerto)
+        """
+        with self._trava:
+            itens, tamanho = self._conexao.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+            ).fetchone()
+        total = self.acertos + self.faltas
+        return {
+            "itens": itens,
+            "bytes": tamanho,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / total if total else 0.0
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def _classe_llm_com_cache():
+    # Importado aqui: o crewai é pesado e só é necessário quando o LLM é de fato criado
+    from crewai import LLM
+
+    class LLMComCache(LLM):
+        """
+        LLM do crewai que consulta o CacheRespostas antes de chamar o modelo
+
+        A chave inclui o modelo, as mensagens completas, a temperatura, as ferramentas e
+        as sequências de parada, então um mesmo prompt repetido é respondido do disco.
+        Com replay=True, nenhuma chamada chega ao modelo: uma chamada sem resposta
+        gravada (ou que executa funções, e por isso nunca é gravada) levanta LookupError,
+        o que torna a execução determinística.
+        """
+
+        def __init__(self, *args, cache_file=cache_llm_padrao, tamanho_maximo=tamanho_maximo_padrao,
+                     replay=False, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.cache = CacheRespostas(cache_file, tamanho_maximo)
+            self.replay = replay
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+            # Chamadas que executam funções têm efeitos colaterais e não são guardadas
+            if available_functions:
+                if self.replay:
+                    raise LookupError("Modo replay: chamadas ao LLM que executam funções não são gravadas em cache")
+                return super().call(messages, tools=tools, callbacks=callbacks,
+                                    available_functions=available_functions, **kwargs)
+
+            chave = chave_chamada(self.model, messages, self.temperature, tools, self.stop)
+            resposta = self.cache.obter(chave)
+            if resposta is not None:
+                contar("llm.cache_acertos")
+                return resposta
+            if self.replay:
+                raise LookupError(f"Modo replay: nenhuma resposta gravada para esta chamada ao LLM ({chave[:12]})")
+
+            with span("llm", modelo=self.model):
+                resposta = super().call(messages, tools=tools, callbacks=callbacks, **kwargs)
+            if isinstance(resposta, str):
+                self.cache.guardar(chave, resposta)
+                if instrumentacao.ativo:
+                    self._contar_tokens(messages, resposta)
+            return resposta
+
+        def _contar_tokens(self, messages, resposta):
+            # Contagem feita localmente pelo tokenizer do litellm (aproximada para modelos sem tokenizer conhecido)
+            from litellm import token_counter
+            if isinstance(messages, str):
+                messages = [{"role": "user", "content": messages}]
+            contar("llm.tokens_entrada", token_counter(model=self.model, messages=messages))
+            contar("llm.tokens_saida", token_counter(model=self.model, text=resposta))
+
+    return LLMComCache
+
+
+def criar_llm(*args, cache_file=cache_llm_padrao, tamanho_maximo=tamanho_maximo_padrao, replay=False, **kwargs):
+    """
+    Cria o LLM do crewai com cache de respostas (LLMComCache); os demais argumentos vão para crewai.LLM
+    """
+    return _classe_llm_com_cache()(*args, cache_file=cache_file, tamanho_maximo=tamanho_maximo, replay=replay, **kwargs)
@@ -0,0 +1,354 @@
+import requests
+from requests.adapters import HTTPAdapter
+from cache_consultas import normalizar_issn
+from instrumentacao import span, contar
+from concurrent.futures import ThreadPoolExecutor
+import json
+import random
+import sqlite3
+import threading
+import time
+
+# --- Configurações ---
+# Endpoint de periódicos da API Crossref
+url_crossref = "https://api.crossref.org/journals/{issn}"
+# Arquivo SQLite do cache de consultas ao Crossref
+cache_crossref_padrao = "./cache_crossref.sqlite3"
+# Tempo (segundos) em que uma resposta é considerada atual (7 dias)
+ttl_padrao = 7 * 24 * 3600
+# Tempo (segundos) em que um ISSN não encontrado (404) continua em cache (1 dia)
+ttl_negativo_padrao = 24 * 3600
+# Limites do "polite pool" do Crossref (requisições identificadas com mailto)
+requisicoes_por_segundo = 10
+requisicoes_simultaneas = 3
+# Limites do "public pool" (requisições sem mailto)
+requisicoes_por_segundo_publico = 5
+requisicoes_simultaneas_publico = 1
+# Máximo de ISSNs aguardando consulta em antecipar; os excedentes são descartados
+max_antecipacoes_pendentes = 50
+# Novas tentativas em respostas 429/5xx e falhas de conexão, com espera exponencial e jitter
+max_tentativas = 4
+espera_base = 0.5
+espera_maxima = 30.0
+
+
+def chave_issn(issn):
+    """
+    Chave usada no cache: o ISSN normalizado, ou o texto original se não tiver formato de ISSN
+    """
+    return normalizar_issn(issn) or str(issn).strip()
+
+
+def formatar_issn(chave):
+    """
+    Formata o ISSN normalizado com hífen (XXXX-XXXX), como esperado pelo Crossref
+    """
+    return f"{chave[:4]}-{chave[4:]}" if normalizar_issn(chave) else chave
+
+
+def extrair_info(message):
+    """
+    Extrai os campos usados pelo sistema da resposta do Crossref
+    """
+    return {
+        "title": message.get("title", "Não disponível"),
+        "publisher": message.get("publisher", "Não disponível"),
+        "ISSN": message.get("ISSN", []),
+        "total_articles": message.get("counts", {}).get("total-dois", 0),
+        "active_articles": message.get("counts", {}).get("current-dois", 0)
+    }
+
+
+class CacheCrossref:
+    """
+    Cache persistente (SQLite) das respostas do Crossref por ISSN
+
+    Guarda também os ISSNs não encontrados (404), com um TTL próprio, para não
+    repetir consultas que já se sabe que falham.
+    """
+
+    def __init__(self, caminho=cache_crossref_padrao, ttl=ttl_padrao, ttl_negativo=ttl_negativo_padrao):
+        self.caminho = caminho
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        with self._trava, self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS crossref ("
+                " issn TEXT PRIMARY KEY,"
+                " status INTEGER NOT NULL,"
+                " dados TEXT,"
+                " atualizado_em REAL NOT NULL)"
+            )
+
+    def obter(self, issn):
+        """
+        Devolve a entrada do cache para o ISSN
+
+        Returns:
+            Tupla (status, dados, atual) ou None se o ISSN nunca foi consultado.
+            'atual' é False quando a entrada passou do TTL (pode ser usada, mas deve ser revalidada).
+        """
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT status, dados, atualizado_em FROM crossref WHERE issn = ?", (chave_issn(issn),)
+            ).fetchone()
+        if linha is None:
+            return None
+        status, dados, atualizado_em = linha
+        ttl = self.ttl if status == 200 else self.ttl_negativo
+        return status, (json.loads(dados) if dados else None), time.time() - atualizado_em < ttl
+
+    def guardar(self, issn, status, dados=None):
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO crossref (issn, status, dados, atualizado_em) VALUES (?, ?, ?, ?)",
+                (chave_issn(issn), status, json.dumps(dados, ensure_ascii=False) if dados is not None else None, time.time())
+            )
+
+
+def limites_crossref(mailto=None):
+    """
+    Limites do pool do Crossref usado pelo cliente: (requisições por segundo, requisições simultâneas)
+
+    Só requisições identificadas com mailto entram no "polite pool"; as demais seguem os
+    limites menores do "public pool".
+    """
+    if mailto:
+        return requisicoes_por_segundo, requisicoes_simultaneas
+    return requisicoes_por_segundo_publico, requisicoes_simultaneas_publico
+
+
+class LimitadorTaxa:
+    """
+    Token bucket compartilhado entre threads: no máximo 'taxa' requisições por segundo
+    """
+
+    def __init__(self, taxa=requisicoes_por_segundo, capacidade=None):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade or taxa)
+        self._fichas = self.capacidade
+        self._ultimo = time.monotonic()
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        """
+        Bloqueia até haver uma ficha disponível e a consome
+        """
+        while True:
+            with self._trava:
+                agora = time.monotonic()
+                self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.taxa
+            time.sleep(espera)
+
+
+class ClienteCrossref:
+    """
+    Cliente da API Crossref com cache persistente e stale-while-revalidate
+
+    Entradas atuais são respondidas direto do cache. Entradas vencidas também são
+    respondidas do cache, enquanto o pool de threads em segundo plano busca a versão nova.
+    Só ISSNs nunca consultados esperam pela rede.
+
+    As requisições usam uma sessão HTTP com conexões keep-alive reaproveitadas,
+    passam por um limitador de taxa e são repetidas com espera exponencial em
+    respostas 429/5xx. buscar_lote consulta vários ISSNs em paralelo e antecipar
+    agenda consultas em segundo plano para ISSNs que provavelmente serão pedidos em seguida.
+    Nunca há mais de max_workers requisições em andamento, somando buscar_lote,
+    antecipar e as revalidações.
+    """
+
+    def __init__(self, cache=None, timeout=10, mailto=None, max_workers=None, taxa=None, semaforo=None):
+        """
+        Args:
+            cache (CacheCrossref): Cache persistente (None = sem cache)
+            timeout (float): Timeout de cada requisição, em segundos
+            mailto (str): E-mail de contato enviado ao Crossref (dá acesso ao "polite pool")
+            max_workers (int): Máximo de requisições simultâneas, em buscar_lote e em segundo plano
+                (None = o limite do pool; ver limites_crossref)
+            taxa (float): Máximo de requisições por segundo (None = o limite do pool)
+            semaforo: Semáforo compartilhado com outros clientes (ex.: multiprocessing.BoundedSemaphore
+                entre processos); substitui o limite de max_workers requisições simultâneas
+        """
+        self.cache = cache
+        self.timeout = timeout
+        self.mailto = mailto
+        # Sem mailto, os limites do "polite pool" não valem: valores maiores que os do pool são reduzidos
+        taxa_pool, simultaneas_pool = limites_crossref(mailto)
+        self.max_workers = min(max_workers or simultaneas_pool, simultaneas_pool)
+        self.limitador = LimitadorTaxa(min(taxa or taxa_pool, taxa_pool))
+        # Vale para todas as requisições do cliente, não só para as de um pool de threads
+        self.simultaneas = semaforo if semaforo is not None else threading.BoundedSemaphore(max(self.max_workers, 1))
+        self.requisicoes = 0
+        self._revalidando = set()
+        self._antecipando = {}
+        self._executor = None
+        self._trava = threading.Lock()
+
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max(self.max_workers, 1))
+        self.sessao.mount("https://", adaptador)
+        agente = "NLP_Reference/1.0"
+        self.sessao.headers["User-Agent"] = f"{agente} (mailto:{mailto})" if mailto else agente
+
+    def buscar(self, issn):
+        """
+        Busca as informações de um periódico pelo ISSN
+
+        Returns:
+            Tupla (status, dados): (200, dict de extrair_info) ou (404, None)
+
+        Raises:
+            requests.exceptions.RequestException: em falhas de rede ou erros HTTP diferentes de 404
+        """
+        chave = chave_issn(issn)
+        entrada = self.cache.obter(chave) if self.cache is not None else None
+        if entrada is not None:
+            contar("crossref.cache_acertos")
+            status, dados, atual = entrada
+            if not atual:
+                self._revalidar(chave)
+            return status, dados
+        contar("crossref.cache_faltas")
+        # Se o ISSN já está sendo baixado por antecipar, espera essa requisição em vez de repeti-la
+        with self._trava:
+            futuro = self._antecipando.get(chave)
+        if futuro is not None:
+            try:
+                return futuro.result()
+            except requests.exceptions.RequestException:
+                pass  # Tenta de novo abaixo, propagando o erro desta tentativa
+        return self._baixar(chave)
+
+    def antecipar(self, issns):
+        """
+        Agenda em segundo plano a consulta dos ISSNs que ainda não estão no cache
+
+        Não bloqueia: as respostas vão para o cache, e um buscar posterior do mesmo
+        ISSN usa o cache ou espera a requisição em andamento. ISSNs já agendados
+        não são consultados de novo. Com max_antecipacoes_pendentes ISSNs já na fila,
+        os demais são descartados (serão consultados quando forem pedidos).
+
+        Returns:
+            Quantidade de ISSNs agendados
+        """
+        if self.cache is None:
+            return 0
+        agendados = 0
+        for chave in dict.fromkeys(chave_issn(issn) for issn in issns):
+            if self.cache.obter(chave) is not None:
+                continue
+            with self._trava:
+                if chave in self._antecipando:
+                    continue
+                if len(self._antecipando) >= max_antecipacoes_pendentes:
+                    contar("crossref.antecipacoes_descartadas")
+                    break
+                futuro = self._executor_fundo().submit(self._baixar, chave)
+                self._antecipando[chave] = futuro
+            futuro.add_done_callback(lambda _, chave=chave: self._concluir_antecipacao(chave))
+            agendados += 1
+        return agendados
+
+    def _executor_fundo(self):
+        # Pool das consultas em segundo plano (antecipar e revalidações); chamado com self._trava
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(self.max_workers, 1), thread_name_prefix="crossref")
+        return self._executor
+
+    def _concluir_antecipacao(self, chave):
+        with self._trava:
+            self._antecipando.pop(chave, None)
+
+    def buscar_lote(self, issns, forcar=False):
+        """
+        Busca vários ISSNs, consultando a rede em paralelo apenas para os que não estão no cache
+
+        Args:
+            issns (list): ISSNs a consultar
+            forcar (bool): Consulta a rede mesmo para ISSNs já em cache (atualiza as entradas)
+
+        Returns:
+            Dicionário ISSN (como recebido) -> (status, dados). Em falhas de rede o status
+            é None e 'dados' traz a mensagem de erro.
+        """
+        chaves = {issn: chave_issn(issn) for issn in issns}
+        unicas = list(dict.fromkeys(chaves.values()))
+
+        def buscar_seguro(chave):
+            try:
+                return self._baixar(chave) if forcar else self.buscar(chave)
+            except requests.exceptions.RequestException as e:
+                return None, str(e)
+
+        if len(unicas) <= 1:
+            respostas = dict(zip(unicas, map(buscar_seguro, unicas)))
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unicas))) as executor:
+                respostas = dict(zip(unicas, executor.map(buscar_seguro, unicas)))
+        return {issn: respostas[chave] for issn, chave in chaves.items()}
+
+    def _get(self, url):
+        """
+        GET com limite de taxa e novas tentativas (espera exponencial com jitter) em 429/5xx
+        """
+        params = {"mailto": self.mailto} if self.mailto else None
+        for tentativa in range(max_tentativas):
+            ultima = tentativa == max_tentativas - 1
+            self.limitador.aguardar()
+            with self._trava:
+                self.requisicoes += 1
+            try:
+                # A espera entre tentativas fica fora do semáforo, liberando a vaga para outra requisição
+                with self.simultaneas, span("crossref.http", tentativa=tentativa):
+                    response = self.sessao.get(url, params=params, timeout=self.timeout)
+                contar("crossref.bytes", len(response.content))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if ultima:
+                    raise
+                response = None
+            else:
+                if ultima or (response.status_code != 429 and response.status_code < 500):
+                    return response
+            time.sleep(self._espera(tentativa, response))
+
+    def _espera(self, tentativa, response):
+        # "Full jitter": espera aleatória até o limite exponencial, respeitando o Retry-After do servidor
+        espera = random.uniform(0, min(espera_maxima, espera_base * 2 ** tentativa))
+        retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+        return max(espera, float(retry_after)) if retry_after.isdigit() else espera
+
+    def _baixar(self, chave):
+        response = self._get(url_crossref.format(issn=formatar_issn(chave)))
+        if response.status_code == 404:
+            status, dados = 404, None
+        else:
+            response.raise_for_status()
+            status, dados = 200, extrair_info(response.json().get("message", {}))
+        if self.cache is not None:
+            self.cache.guardar(chave, status, dados)
+        return status, dados
+
+    def _revalidar(self, chave):
+        def tarefa():
+            try:
+                self._baixar(chave)
+            except requests.exceptions.RequestException:
+                pass  # Mantém a entrada antiga; a próxima consulta tenta de novo
+            finally:
+                with self._trava:
+                    self._revalidando.discard(chave)
+
+        # Revalidações vão para o mesmo pool limitado de antecipar, em vez de uma thread por ISSN
+        with self._trava:
+            if chave in self._revalidando:
+                return
+            self._revalidando.add(chave)
+            self._executor_fundo().submit(tarefa)
@@ -0,0 +1,120 @@
+import numpy as np
+import argparse
+import os
+import re
+import time
+
+# --- Configurações ---
+# Modos de execução do modelo de embedding: "float" (original) ou "int8" (quantização dinâmica)
+modos_codificador = ("float", "int8")
+# Diretório onde o modelo quantizado é guardado depois da primeira exportação
+diretorio_modelos_padrao = "./modelos"
+# Linhas do CSV usadas na verificação de paridade
+amostra_paridade = 5000
+# Consultas (tiradas da amostra) usadas para comparar os k vizinhos mais próximos
+consultas_paridade = 200
+
+
+def nome_cache(model_name, modo="float"):
+    """
+    Nome do modelo no cache de embeddings; vetores do modo int8 não se misturam com os do modelo float
+    """
+    return model_name if modo == "float" else f"{model_name}-{modo}"
+
+
+def carregar_codificador(model_name, modo="float", diretorio=diretorio_modelos_padrao):
+    """
+    Carrega o SentenceTransformer no modo pedido
+
+    No modo "int8", as camadas lineares do modelo são quantizadas dinamicamente
+    (pesos em int8, ativações quantizadas durante a inferência), o que acelera a
+    codificação em CPU. O modelo quantizado é gravado em 'diretorio' na primeira vez
+    e reaproveitado nas seguintes.
+    """
+    if modo not in modos_codificador:
+        raise ValueError(f"Unknown encoder mode '{modo}' (use one of {modos_codificador})")
+
+    # Importados aqui para que quem só usa o cache de embeddings não pague a importação do PyTorch
+    from sentence_transformers import SentenceTransformer
+    if modo == "float":
+        return SentenceTransformer(model_name)
+
+    import torch
+    caminho = os.path.join(diretorio, re.sub(r'[^A-Za-z0-9_.-]+', '_', nome_cache(model_name, modo)) + ".pt")
+    if os.path.exists(caminho):
+        return torch.load(caminho, map_location="cpu", weights_only=False)
+
+    print(f"Quantizando o modelo '{model_name}' (int8). Isso só acontece na primeira vez...")
+    model = SentenceTransformer(model_name, device="cpu")
+    torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    os.makedirs(diretorio, exist_ok=True)
+    temporario = caminho + ".tmp"
+    torch.save(model, temporario)
+    os.replace(temporario, caminho)
+    print(f"Modelo quantizado salvo em '{caminho}'.")
+    return model
+
+
+def vizinhos(corpus, consultas, k):
+    """
+    Índices dos k vizinhos mais próximos (distância L2, como nos índices de busca) de cada consulta
+    """
+    distancias = (corpus * corpus).sum(axis=1) - 2 * consultas @ corpus.T
+    proximos = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+    return [set(linha) for linha in proximos]
+
+
+def verificar_paridade(model_name, textos, k=10, n_consultas=consultas_paridade, tamanho_lote=64):
+    """
+    Compara os embeddings do modelo quantizado com os do modelo float
+
+    Returns:
+        Dicionário com a similaridade de cosseno entre os vetores dos dois modelos,
+        a sobreposição dos k vizinhos mais próximos (consultas int8 no índice float,
+        e índice e consultas int8) e o tempo de codificação de cada modo
+    """
+    resultado = {}
+    vetores = {}
+    for modo in modos_codificador:
+        model = carregar_codificador(model_name, modo)
+        inicio = time.perf_counter()
+        vetores[modo] = np.asarray(model.encode(textos, batch_size=tamanho_lote), dtype=np.float32)
+        resultado[f"segundos_{modo}"] = time.perf_counter() - inicio
+
+    original, quantizado = vetores["float"], vetores["int8"]
+    cossenos = (original * quantizado).sum(axis=1) / (
+        np.linalg.norm(original, axis=1) * np.linalg.norm(quantizado, axis=1))
+    resultado["cosseno_medio"] = float(cossenos.mean())
+    resultado["cosseno_minimo"] = float(cossenos.min())
+
+    k = min(k, len(textos))
+    consultas = np.random.default_rng(0).choice(len(textos), min(n_consultas, len(textos)), replace=False)
+    referencia = vizinhos(original, original[consultas], k)
+    for nome, corpus in (("sobreposicao_consulta_int8", original), ("sobreposicao_indice_int8", quantizado)):
+        obtidos = vizinhos(corpus, quantizado[consultas], k)
+        resultado[nome] = float(np.mean([len(a & b) / k for a, b in zip(referencia, obtidos)]))
+
+    resultado["aceleracao"] = resultado["segundos_float"] / resultado["segundos_int8"]
+    return resultado
+
+
+if __name__ == "__main__":
+    from criar_embbendings_chroma import input_csv_file, embedding_model_name, carregar_blocos
+
+    parser = argparse.ArgumentParser(description="Exporta o modelo de embedding quantizado (int8) e verifica sua paridade com o modelo float.")
+    parser.add_argument('--amostra', type=int, default=amostra_paridade,
+                        help=f"Linhas do CSV codificadas na verificação (padrão: {amostra_paridade}).")
+    parser.add_argument('-k', type=int, default=10, help="Vizinhos comparados por consulta (padrão: 10).")
+    args = parser.parse_args()
+
+    # A exportação acontece na primeira carga do modo int8
+    carregar_codificador(embedding_model_name, "int8")
+
+    textos = next(carregar_blocos(input_csv_file, args.amostra))['texto_combinado'].tolist()
+    print(f"\nVerificando a paridade em {len(textos)} textos do '{input_csv_file}'...")
+    resultado = verificar_paridade(embedding_model_name, textos, args.k)
+    print(f"Similaridade de cosseno float x int8: média {resultado['cosseno_medio']:.4f} | mínima {resultado['cosseno_minimo']:.4f}")
+    print(f"Sobreposição top-{args.k} (consultas int8, índice float): {resultado['sobreposicao_consulta_int8']:.1%}")
+    print(f"Sobreposição top-{args.k} (consultas e índice int8): {resultado['sobreposicao_indice_int8']:.1%}")
+    print(f"Tempo de codificação: float {resultado['segundos_float']:.1f}s | int8 {resultado['segundos_int8']:.1f}s "
+          f"({resultado['aceleracao']:.1f}x)")
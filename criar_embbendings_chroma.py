@@ -1,9 +1,17 @@
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from langchain_community.vectorstores import Chroma
+import chromadb
+from cache_embeddings import EmbeddingCache
+from codificador import modos_codificador, carregar_codificador, nome_cache
+from busca import (nome_colecao, campos_filtro, campo_pares, separador_valores, valores_campo,
+                   chave_multivalor, chave_par, particoes_shards, shards_da_linha, ExportacaoNumpy, IndiceExato)
+import argparse
+from collections import Counter
+from contextlib import contextmanager
+import hashlib
+import json
 import os # Importar para gerenciar o diretório do ChromaDB
+import shutil
 
 # --- Configurações ---
 # Nome do arquivo CSV de entrada
@@ -12,79 +20,535 @@ input_csv_file = 'sucupira.csv'
 chroma_db_dir = "./sucupira_chroma_db"
 # Modelo de embedding
 embedding_model_name = 'paraphrase-MiniLM-L6-v2'
+# Colunas do CSV guardadas como metadados de cada documento
+colunas_metadados = ['Título', 'Área de Avaliação', 'ISSN', 'Estrato']
+# Quantidade máxima de documentos enviados ao ChromaDB por chamada
+tamanho_lote_chroma = 5000
+# Quantidade de textos processados pelo modelo em cada passo de codificação
+tamanho_lote_encode = 64
+# Quantidade de linhas do CSV lidas por vez no modo streaming
+tamanho_bloco_csv = 20000
+# Diretório do cache de embeddings compartilhado com rag.py e periodicos.py
+diretorio_cache = "./cache_embeddings"
+# Diretório da matriz de embeddings exportada para o backend de busca NumPy
+numpy_dir = "./sucupira_numpy"
+# Diretório do índice particionado em shards (backend de busca "shards")
+shards_dir = "./sucupira_shards"
+# Quantidade de shards na partição por hash do ISSN
+num_shards_hash = 16
+# Índice de consultas exatas por ISSN e título, usado antes da busca semântica
+indice_exato_file = "./sucupira_indice_exato.sqlite3"
 
-# 1. Carregar o arquivo CSV
-try:
-    df = pd.read_csv(input_csv_file)
-    print(f"Arquivo '{input_csv_file}' carregado com sucesso.")
-except FileNotFoundError:
-    print(f"Erro: O arquivo '{input_csv_file}' não foi encontrado. Por favor, verifique o caminho.")
-    exit() # Encerrar o script se o arquivo não for encontrado
-
-# 2. Combinar as duas colunas em uma única string
-df['texto_combinado'] = df['Título'] + " " + df['Área de Avaliação']
-
-# Opcional: Remover linhas onde o texto combinado possa ser vazio ou nulo
-initial_rows = len(df)
-df.dropna(subset=['texto_combinado'], inplace=True)
-if len(df) < initial_rows:
-    print(f"Foram removidas {initial_rows - len(df)} linhas com 'texto_combinado' vazio ou nulo.")
-else:
-    print("Nenhuma linha com 'texto_combinado' vazio ou nulo encontrada.")
-
-# 3. Carregar um modelo de embedding pré-treinado
-print(f"\nCarregando o modelo de embedding '{embedding_model_name}'. Isso pode levar um momento na primeira vez...")
-model = SentenceTransformer(embedding_model_name)
-print("Modelo carregado com sucesso!")
-
-# 4. Gerar os embeddings
-print("Gerando os embeddings. Aguarde...")
-embeddings = model.encode(df['texto_combinado'].tolist(), show_progress_bar=True)
-print("Embeddings gerados!")
-
-# 5. Preparar os dados para o ChromaDB
-# O ChromaDB precisa dos textos e dos metadados (informações adicionais sobre cada texto)
-documents = df['texto_combinado'].tolist()
-# Criamos metadados a partir de outras colunas do DataFrame, úteis para recuperação futura
-metadatas = df[['Título', 'Área de Avaliação', 'ISSN', 'Estrato']].to_dict(orient='records')
-
-# 6. Inicializar a função de embedding para o ChromaDB (usando o mesmo modelo)
-# É fundamental que a função de embedding usada para criar e consultar o ChromaDB seja a mesma.
-embedding_function_chroma = SentenceTransformerEmbeddings(model_name=embedding_model_name)
-
-# 7. Salvar os embeddings diretamente no ChromaDB
-print(f"\nSalvando os embeddings no ChromaDB em '{chroma_db_dir}'. Isso pode levar um tempo...")
-
-# Remover o diretório existente do ChromaDB, se houver, para evitar conflitos ou dados antigos
-if os.path.exists(chroma_db_dir):
-    import shutil
-    shutil.rmtree(chroma_db_dir)
-    print(f"Diretório existente '{chroma_db_dir}' removido para recriação.")
-
-# Criar e persistir o VectorStore
-vectorstore = Chroma.from_texts(
-    texts=documents,
-    embedding=embedding_function_chroma,
-    metadatas=metadatas,
-    persist_directory=chroma_db_dir
-)
-print("Embeddings salvos no ChromaDB com sucesso!")
-
-# Para verificar se foi salvo, você pode carregar e fazer uma busca simples (opcional)
-print("\nVerificando o ChromaDB (carregando e fazendo uma busca de teste)...")
-loaded_vectorstore = Chroma(
-    persist_directory=chroma_db_dir,
-    embedding_function=embedding_function_chroma
-)
-
-query = "cursos de medicina"
-results = loaded_vectorstore.similarity_search_with_score(query, k=3) # Buscar 3 resultados mais similares
-print(f"\nResultados da busca por '{query}':")
-for doc, score in results:
-    print(f"- Título: {doc.metadata.get('Título', 'N/A')}")
-    print(f"  Área: {doc.metadata.get('Área de Avaliação', 'N/A')}")
-    print(f"  Conteúdo: {doc.page_content[:100]}...")
-    print(f"  Score de similaridade: {score:.4f}")
-    print("---")
-
-print("\nProcesso concluído. O ChromaDB está pronto para uso!")
\ No newline at end of file
+
+def carregar_blocos(caminho, tamanho_bloco=None):
+    """
+    Lê o CSV e devolve os DataFrames prontos para indexação
+
+    Sem 'tamanho_bloco' o arquivo inteiro é lido de uma vez; com ele, o CSV é lido
+    em blocos de 'tamanho_bloco' linhas e só um bloco fica na memória por vez.
+
+    Args:
+        caminho (str): Caminho do arquivo CSV da Sucupira
+        tamanho_bloco (int): Linhas por bloco no modo streaming (None = arquivo inteiro)
+
+    Returns:
+        Iterador de DataFrames com as colunas originais, 'texto_combinado', 'id' e 'hash_conteudo'
+    """
+    # 1. Carregar o arquivo CSV
+    try:
+        leitor = pd.read_csv(caminho, chunksize=tamanho_bloco)
+        print(f"Arquivo '{caminho}' carregado com sucesso.")
+    except FileNotFoundError:
+        print(f"Erro: O arquivo '{caminho}' não foi encontrado. Por favor, verifique o caminho.")
+        exit() # Encerrar o script se o arquivo não for encontrado
+
+    if tamanho_bloco is None:
+        return iter([preparar_textos(leitor)])
+    return _iterar_blocos(leitor)
+
+
+def _iterar_blocos(leitor):
+    """
+    Percorre os blocos do leitor do pandas, preparando um de cada vez
+    """
+    with leitor:
+        for numero, bloco in enumerate(leitor, 1):
+            print(f"\nBloco {numero}: {len(bloco)} linhas lidas.")
+            yield preparar_textos(bloco)
+
+
+def preparar_textos(df):
+    """
+    Monta a coluna 'texto_combinado' e os campos de controle da atualização incremental
+    """
+    # 2. Combinar as duas colunas em uma única string
+    df['texto_combinado'] = df['Título'] + " " + df['Área de Avaliação']
+
+    # Opcional: Remover linhas onde o texto combinado possa ser vazio ou nulo
+    initial_rows = len(df)
+    df.dropna(subset=['texto_combinado'], inplace=True)
+    if len(df) < initial_rows:
+        print(f"Foram removidas {initial_rows - len(df)} linhas com 'texto_combinado' vazio ou nulo.")
+
+    # Cada linha ganha um ID estável (ISSN + Área de Avaliação) e um hash do conteúdo,
+    # usados pela atualização incremental para saber o que mudou entre duas versões do CSV
+    df['id'] = gerar_ids(df)
+    df['hash_conteudo'] = gerar_hashes(df)
+
+    duplicadas = df.duplicated(subset=['id'], keep='last')
+    if duplicadas.any():
+        print(f"Foram ignoradas {int(duplicadas.sum())} linhas com ISSN e Área de Avaliação repetidos (mantida a última ocorrência).")
+        df = df[~duplicadas]
+
+    return df
+
+
+def gerar_ids(df):
+    """
+    Gera o ID estável de cada linha a partir do ISSN e da Área de Avaliação
+    """
+    issn = df['ISSN'].fillna('').astype(str).str.strip().str.upper()
+    area = df['Área de Avaliação'].fillna('').astype(str).str.strip()
+    return issn + "|" + area
+
+
+def gerar_hashes(df):
+    """
+    Gera o hash SHA-256 do texto e dos metadados de cada linha
+    """
+    colunas = ['texto_combinado'] + colunas_metadados
+    conteudo = df[colunas].fillna('').astype(str).agg("\x1f".join, axis=1)
+    return conteudo.map(lambda texto: hashlib.sha256(texto.encode('utf-8')).hexdigest())
+
+
+def agrupar_por_periodico(blocos, tamanho_bloco=None):
+    """
+    Agrupa as linhas do CSV (uma por periódico e área) em um documento por ISSN
+
+    As áreas e os estratos de cada periódico ficam em campos multivalorados
+    (separados por busca.separador_valores) e a lista de pares (área, estrato)
+    em JSON no metadado 'Áreas'. Só os metadados textuais ficam na memória durante
+    o agrupamento; os documentos são devolvidos em blocos de 'tamanho_bloco' periódicos.
+    """
+    periodicos = {}
+    for df in blocos:
+        for titulo, area, issn, estrato in df[colunas_metadados].itertuples(index=False):
+            registro = periodicos.setdefault(str(issn).strip().upper(), {'Título': titulo, 'ISSN': issn, 'areas': {}})
+            # 'N/A' mantém as listas de áreas e estratos alinhadas por posição (ver busca.pares_area_estrato)
+            registro['areas'][area] = 'N/A' if pd.isna(estrato) else str(estrato)
+
+    linhas = []
+    for id_periodico, registro in periodicos.items():
+        pares = sorted(registro['areas'].items())
+        linhas.append({
+            'Título': registro['Título'],
+            'ISSN': registro['ISSN'],
+            'Área de Avaliação': separador_valores.join(area for area, _ in pares),
+            'Estrato': separador_valores.join(estrato for _, estrato in pares),
+            'Áreas': json.dumps(pares, ensure_ascii=False),
+            'texto_combinado': registro['Título'] + " " + " ".join(area for area, _ in pares),
+            'id': id_periodico
+        })
+    print(f"\n{len(linhas)} periódicos distintos agrupados por ISSN.")
+
+    tamanho_bloco = tamanho_bloco or max(len(linhas), 1)
+    for inicio in range(0, len(linhas), tamanho_bloco):
+        df = pd.DataFrame(linhas[inicio:inicio + tamanho_bloco])
+        df['hash_conteudo'] = gerar_hashes(df)
+        yield df
+
+
+def registrar_valores_filtro(blocos, valores):
+    """
+    Repassa os blocos do CSV guardando os valores distintos dos campos de filtro
+
+    Os valores são gravados nos metadados da coleção; o BuscadorChroma os usa para converter
+    os filtros para a grafia gravada sem percorrer todos os documentos.
+    """
+    for df in blocos:
+        for campo in campos_filtro:
+            valores[campo].update(df[campo].dropna().astype(str).unique())
+        yield df
+
+
+def preparar_metadados(df):
+    """
+    Cria os metadados de cada documento, incluindo o hash do conteúdo
+    """
+    if 'Áreas' not in df:
+        return df[colunas_metadados + ['hash_conteudo']].to_dict(orient='records')
+
+    # Um documento por periódico: cada valor de área e estrato também vira uma chave booleana,
+    # usada pelos filtros do ChromaDB (que não aceita listas como metadado). Cada par (área, estrato)
+    # ganha sua própria chave, para que o filtro por área e estrato não combine pares diferentes.
+    metadatas = df[colunas_metadados + ['hash_conteudo', 'Áreas']].to_dict(orient='records')
+    for metadados in metadatas:
+        for campo in campos_filtro:
+            for valor in valores_campo(metadados[campo]):
+                metadados[chave_multivalor(campo, valor)] = True
+        for area, estrato in json.loads(metadados['Áreas']):
+            metadados[chave_multivalor(campo_pares, chave_par(area, estrato))] = True
+    return metadatas
+
+
+def em_lotes(itens, tamanho):
+    """
+    Divide uma lista em fatias de no máximo 'tamanho' elementos
+    """
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def carregar_modelo(modo="float"):
+    """
+    Carrega o modelo de embedding pré-treinado ("float" ou quantizado em "int8")
+    """
+    # 3. Carregar um modelo de embedding pré-treinado
+    print(f"\nCarregando o modelo de embedding '{embedding_model_name}' ({modo}). Isso pode levar um momento na primeira vez...")
+    model = carregar_codificador(embedding_model_name, modo)
+    print("Modelo carregado com sucesso!")
+    return model
+
+
+@contextmanager
+def pool_codificacao(model, processos=1):
+    """
+    Inicia um pool de processos de codificação, reaproveitado por todos os lotes
+
+    Com 'processos' <= 1 nenhum pool é criado e a codificação ocorre no processo atual.
+    """
+    if processos <= 1:
+        yield None
+        return
+    # Cada processo recebe uma cópia do modelo e uma fatia dos textos
+    pool = model.start_multi_process_pool(['cpu'] * processos)
+    try:
+        yield pool
+    finally:
+        model.stop_multi_process_pool(pool)
+
+
+def gerar_embeddings(model, textos, tamanho_lote=tamanho_lote_encode, pool=None, cache=None):
+    """
+    Gera os embeddings dos textos, opcionalmente em vários processos
+
+    Args:
+        model: Modelo SentenceTransformer já carregado
+        textos (list): Textos a serem codificados
+        tamanho_lote (int): Quantidade de textos por passo do modelo
+        pool: Pool criado por pool_codificacao (None = processo atual)
+        cache: EmbeddingCache consultado antes do modelo (None = sem cache)
+
+    Returns:
+        Matriz numpy (float32) com um embedding por texto
+    """
+    def codificar(textos_faltantes):
+        print(f"Gerando os embeddings de {len(textos_faltantes)} textos. Aguarde...")
+        if pool is not None and len(textos_faltantes) > tamanho_lote:
+            return model.encode_multi_process(textos_faltantes, pool, batch_size=tamanho_lote)
+        return model.encode(textos_faltantes, batch_size=tamanho_lote, show_progress_bar=True)
+
+    if cache is None:
+        embeddings = codificar(textos)
+    else:
+        faltas_antes = cache.faltas
+        embeddings = cache.obter(textos, codificar)
+        print(f"Cache de embeddings: {len(textos) - (cache.faltas - faltas_antes)} de {len(textos)} textos já estavam no cache.")
+    print("Embeddings gerados!")
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def abrir_colecao():
+    """
+    Abre (ou cria) a coleção do ChromaDB lida por rag.py e periodicos.py (busca.BuscadorChroma)
+
+    Returns:
+        Tupla (client, collection) do chromadb
+    """
+    client = chromadb.PersistentClient(path=chroma_db_dir)
+    # Os vetores são sempre calculados aqui, então a coleção não precisa de função de embedding
+    collection = client.get_or_create_collection(name=nome_colecao, embedding_function=None)
+    return client, collection
+
+
+def gravar_documentos(client, collection, df, embeddings):
+    """
+    Faz upsert dos documentos com os embeddings já calculados, em lotes grandes
+    """
+    documents = df['texto_combinado'].tolist()
+    # Criamos metadados a partir de outras colunas do DataFrame, úteis para recuperação futura
+    metadatas = preparar_metadados(df)
+    ids = df['id'].tolist()
+
+    tamanho = min(tamanho_lote_chroma, client.get_max_batch_size())
+    for inicio in range(0, len(ids), tamanho):
+        fim = inicio + tamanho
+        collection.upsert(
+            ids=ids[inicio:fim],
+            embeddings=embeddings[inicio:fim],
+            metadatas=metadatas[inicio:fim],
+            documents=documents[inicio:fim]
+        )
+
+
+def construir_completo(blocos, model, tamanho_lote=tamanho_lote_encode, processos=1, cache=None):
+    """
+    Recria o ChromaDB do zero com todas as linhas lidas do CSV
+
+    Cada bloco é codificado e gravado antes de o próximo ser lido, então a memória
+    usada depende do tamanho do bloco e não do tamanho do arquivo.
+    """
+    # Remover o diretório existente do ChromaDB, se houver, para evitar conflitos ou dados antigos
+    if os.path.exists(chroma_db_dir):
+        shutil.rmtree(chroma_db_dir)
+        print(f"Diretório existente '{chroma_db_dir}' removido para recriação.")
+
+    client, collection = abrir_colecao()
+    total = 0
+    with pool_codificacao(model, processos) as pool:
+        for df in blocos:
+            # 4. Gerar os embeddings (cada linha é codificada uma única vez)
+            embeddings = gerar_embeddings(model, df['texto_combinado'].tolist(), tamanho_lote, pool, cache)
+
+            # 5. Salvar os embeddings diretamente no ChromaDB
+            print(f"Salvando {len(df)} embeddings no ChromaDB em '{chroma_db_dir}'...")
+            gravar_documentos(client, collection, df, embeddings)
+            total += len(df)
+
+    print(f"\n{total} embeddings salvos no ChromaDB com sucesso!")
+
+
+def atualizar_incremental(blocos, model, tamanho_lote=tamanho_lote_encode, processos=1, cache=None):
+    """
+    Atualiza o ChromaDB existente gerando embeddings apenas para as linhas
+    novas ou alteradas e removendo as que não estão mais no CSV
+    """
+    client, collection = abrir_colecao()
+
+    # Coleções por periódico gravadas antes das chaves de par (área, estrato) são regravadas por inteiro
+    legada = bool((collection.metadata or {}).get("por_periodico")) and not (collection.metadata or {}).get("pares_area_estrato")
+    # Hashes já indexados, lidos dos metadados em lotes (sem carregar os vetores); de cada documento só
+    # o ID e o hash ficam na memória
+    hashes_existentes = {}
+    for inicio in range(0, collection.count(), tamanho_lote_chroma):
+        lote = collection.get(include=['metadatas'], limit=tamanho_lote_chroma, offset=inicio)
+        for id_doc, metadados in zip(lote['ids'], lote['metadatas']):
+            hashes_existentes[id_doc] = None if legada else (metadados or {}).get('hash_conteudo')
+    print(f"\nDocumentos no ChromaDB: {len(hashes_existentes)}")
+
+    ids_csv = set()
+    linhas = novos = alterados_total = 0
+    with pool_codificacao(model, processos) as pool:
+        for df in blocos:
+            alterados = df[[hashes_existentes.get(id_doc) != hash_doc
+                            for id_doc, hash_doc in zip(df['id'], df['hash_conteudo'])]]
+            ids_csv.update(df['id'])
+            linhas += len(df)
+            novos += sum(1 for id_doc in alterados['id'] if id_doc not in hashes_existentes)
+            alterados_total += len(alterados)
+
+            if len(alterados) > 0:
+                embeddings = gerar_embeddings(model, alterados['texto_combinado'].tolist(), tamanho_lote, pool, cache)
+                # upsert: IDs já existentes têm o vetor e os metadados substituídos
+                gravar_documentos(client, collection, alterados, embeddings)
+                # Um ID repetido em um bloco seguinte é comparado com o que acabou de ser gravado,
+                # então a última ocorrência prevalece, como na construção completa
+                hashes_existentes.update(zip(alterados['id'], alterados['hash_conteudo']))
+
+    removidos = [id_doc for id_doc in hashes_existentes if id_doc not in ids_csv]
+    for lote in em_lotes(removidos, tamanho_lote_chroma):
+        collection.delete(ids=lote)
+
+    print(f"\nLinhas no CSV: {linhas}")
+    print(f"Novos: {novos} | alterados: {alterados_total - novos} | removidos: {len(removidos)} | "
+          f"inalterados: {linhas - alterados_total}")
+    print("ChromaDB atualizado com sucesso!")
+
+
+def _substituir_diretorio(temporario, diretorio):
+    if os.path.exists(diretorio):
+        shutil.rmtree(diretorio)
+    os.rename(temporario, diretorio)
+
+
+def exportar_numpy(collection, diretorio=numpy_dir, dtype='float32'):
+    """
+    Exporta a coleção do ChromaDB para o backend de busca NumPy (busca.BuscadorNumpy)
+
+    Grava a matriz de embeddings contígua em 'embeddings.npy' (float32 ou float16),
+    a norma ao quadrado de cada linha em 'normas.npy', uma coluna de metadados por
+    arquivo .npy e o índice invertido dos filtros, todos abertos por memory-map na busca. A coleção é lida em lotes
+    e a matriz é escrita direto no disco, sem carregar todos os vetores na memória.
+    """
+    total = collection.count()
+    print(f"\nExportando {total} embeddings para '{diretorio}' ({dtype})...")
+
+    # Grava em um diretório temporário e só substitui o anterior ao final
+    temporario = diretorio + '.tmp'
+    if os.path.exists(temporario):
+        shutil.rmtree(temporario)
+    exportacao = ExportacaoNumpy(temporario, total, dtype, {'modelo': embedding_model_name})
+    for inicio in range(0, total, tamanho_lote_chroma):
+        lote = collection.get(include=['embeddings', 'metadatas', 'documents'],
+                              limit=tamanho_lote_chroma, offset=inicio)
+        exportacao.adicionar(lote['embeddings'], lote['metadatas'], lote['documents'], lote['ids'])
+    exportacao.finalizar()
+
+    _substituir_diretorio(temporario, diretorio)
+    print(f"Matriz de embeddings exportada para '{diretorio}'.")
+
+
+def exportar_shards(collection, diretorio=shards_dir, particao='area', num_shards=16, dtype='float32'):
+    """
+    Exporta a coleção do ChromaDB particionada em shards (busca.BuscadorShards)
+
+    Cada shard é um diretório no formato do backend NumPy. Com particao='area', há um
+    shard por Área de Avaliação (um documento com várias áreas vai para o shard de cada
+    uma); com particao='hash', as linhas são distribuídas pelo hash do ISSN em
+    'num_shards' shards de tamanhos parecidos. A coleção é lida duas vezes: a primeira
+    passada só lê os metadados, para saber o tamanho de cada shard antes de gravar.
+    """
+    total = collection.count()
+    print(f"\nExportando {total} embeddings em shards (partição '{particao}') para '{diretorio}' ({dtype})...")
+
+    destinos = []
+    areas = {}
+    for inicio in range(0, total, tamanho_lote_chroma):
+        lote = collection.get(include=['metadatas'], limit=tamanho_lote_chroma, offset=inicio)
+        for metadados in lote['metadatas']:
+            metadados = metadados or {}
+            nomes = shards_da_linha(metadados, particao, num_shards)
+            destinos.append(nomes)
+            for nome in nomes:
+                areas.setdefault(nome, set()).update(valores_campo(metadados.get("Área de Avaliação", "N/A")))
+    linhas = Counter(nome for nomes in destinos for nome in nomes)
+
+    temporario = diretorio + '.tmp'
+    if os.path.exists(temporario):
+        shutil.rmtree(temporario)
+    os.makedirs(temporario)
+    exportacoes = {nome: ExportacaoNumpy(os.path.join(temporario, nome), linhas[nome], dtype, {'modelo': embedding_model_name})
+                   for nome in sorted(linhas)}
+    for inicio in range(0, total, tamanho_lote_chroma):
+        lote = collection.get(include=['embeddings', 'metadatas', 'documents'],
+                              limit=tamanho_lote_chroma, offset=inicio)
+        vetores = np.asarray(lote['embeddings'], dtype=np.float32)
+        posicoes = {}
+        for posicao, nomes in enumerate(destinos[inicio:inicio + len(vetores)]):
+            for nome in nomes:
+                posicoes.setdefault(nome, []).append(posicao)
+        for nome, selecionadas in posicoes.items():
+            exportacoes[nome].adicionar(vetores[selecionadas], [lote['metadatas'][i] for i in selecionadas],
+                                        [lote['documents'][i] for i in selecionadas], [lote['ids'][i] for i in selecionadas])
+    for exportacao in exportacoes.values():
+        exportacao.finalizar()
+
+    with open(os.path.join(temporario, 'shards.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump({'modelo': embedding_model_name, 'particao': particao, 'dtype': dtype,
+                   'shards': {nome: {'linhas': linhas[nome], 'areas': sorted(areas[nome])} for nome in exportacoes}},
+                  arquivo, ensure_ascii=False, indent=2)
+
+    _substituir_diretorio(temporario, diretorio)
+    tamanhos = sorted(linhas.values())
+    print(f"{len(exportacoes)} shards exportados para '{diretorio}' "
+          f"(menor: {tamanhos[0] if tamanhos else 0} linhas, maior: {tamanhos[-1] if tamanhos else 0} linhas).")
+
+
+def gravar_indice_exato(collection, caminho=indice_exato_file):
+    """
+    Gera o índice de ISSN e título (busca.IndiceExato) a partir da coleção do ChromaDB
+
+    A coleção é lida em lotes, só com os metadados, e cada lote é gravado antes do próximo.
+    """
+    def lotes():
+        total = collection.count()
+        for inicio in range(0, total, tamanho_lote_chroma):
+            lote = collection.get(include=['metadatas'], limit=tamanho_lote_chroma, offset=inicio)
+            yield lote['ids'], lote['metadatas']
+
+    issns, titulos = IndiceExato.gravar(lotes(), caminho)
+    print(f"\nÍndice exato salvo em '{caminho}' ({issns} ISSNs, {titulos} títulos).")
+
+
+def verificar(model, cache=None):
+    """
+    Carrega o ChromaDB salvo e faz uma busca simples de teste
+    """
+    print("\nVerificando o ChromaDB (carregando e fazendo uma busca de teste)...")
+    _, collection = abrir_colecao()
+
+    query = "cursos de medicina"
+    query_embedding = cache.obter([query], model.encode) if cache is not None else model.encode([query])
+    results = collection.query(query_embeddings=query_embedding, n_results=3) # Buscar 3 resultados mais similares
+    print(f"\nResultados da busca por '{query}':")
+    for metadados, documento, score in zip(results['metadatas'][0], results['documents'][0], results['distances'][0]):
+        print(f"- Título: {metadados.get('Título', 'N/A')}")
+        print(f"  Área: {metadados.get('Área de Avaliação', 'N/A')}")
+        print(f"  Conteúdo: {documento[:100]}...")
+        print(f"  Score de similaridade: {score:.4f}")
+        print("---")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os embeddings do dataset Sucupira e os salva no ChromaDB.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Atualiza o ChromaDB existente processando apenas linhas novas, alteradas ou removidas.")
+    parser.add_argument('--batch-size', type=int, default=tamanho_lote_encode,
+                        help=f"Quantidade de textos por passo do modelo (padrão: {tamanho_lote_encode}).")
+    parser.add_argument('--processos', type=int, default=1,
+                        help="Número de processos de codificação; use 0 para um por núcleo de CPU (padrão: 1).")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Lê o CSV em blocos, mantendo o uso de memória constante independentemente do tamanho do arquivo.")
+    parser.add_argument('--tamanho-bloco', type=int, default=tamanho_bloco_csv,
+                        help=f"Linhas do CSV por bloco no modo streaming (padrão: {tamanho_bloco_csv}).")
+    parser.add_argument('--sem-cache', action='store_true',
+                        help=f"Não usa o cache de embeddings em '{diretorio_cache}' (todos os textos são codificados pelo modelo).")
+    parser.add_argument('--por-periodico', action='store_true',
+                        help="Gera um único documento por ISSN, com as áreas e estratos como metadados multivalorados.")
+    parser.add_argument('--exportar-numpy', action='store_true',
+                        help=f"Exporta também a matriz de embeddings para o backend de busca NumPy em '{numpy_dir}'.")
+    parser.add_argument('--dtype-numpy', choices=['float32', 'float16'], default='float32',
+                        help="Tipo da matriz exportada; float16 ocupa metade do espaço (padrão: float32).")
+    parser.add_argument('--exportar-shards', choices=particoes_shards, default=None,
+                        help=f"Exporta também o índice particionado em shards para o backend 'shards' em '{shards_dir}': "
+                             "um shard por Área de Avaliação ('area') ou pelo hash do ISSN ('hash').")
+    parser.add_argument('--num-shards', type=int, default=num_shards_hash,
+                        help=f"Quantidade de shards na partição por hash (padrão: {num_shards_hash}).")
+    parser.add_argument('--modo-codificador', choices=modos_codificador, default='float',
+                        help="Usa o modelo quantizado (int8), mais rápido em CPU; use o mesmo modo nas consultas (padrão: float).")
+    args = parser.parse_args()
+    processos = args.processos if args.processos > 0 else (os.cpu_count() or 1)
+
+    model = carregar_modelo(args.modo_codificador)
+    cache = None if args.sem_cache else EmbeddingCache(nome_cache(embedding_model_name, args.modo_codificador), diretorio_cache)
+    blocos = carregar_blocos(input_csv_file, args.tamanho_bloco if args.streaming else None)
+    if args.por_periodico:
+        blocos = agrupar_por_periodico(blocos, args.tamanho_bloco if args.streaming else None)
+    valores_filtro = {campo: set() for campo in campos_filtro}
+    blocos = registrar_valores_filtro(blocos, valores_filtro)
+
+    if args.incremental and os.path.exists(chroma_db_dir):
+        atualizar_incremental(blocos, model, args.batch_size, processos, cache)
+    else:
+        if args.incremental:
+            print(f"Diretório '{chroma_db_dir}' não encontrado. Realizando a construção completa.")
+        construir_completo(blocos, model, args.batch_size, processos, cache)
+
+    collection = abrir_colecao()[1]
+    # Indica aos buscadores se os campos de área e estrato são multivalorados, se há chaves de par (área, estrato)
+    # e quais valores existem em cada campo de filtro (o ChromaDB só guarda escalares nos metadados da coleção)
+    collection.modify(metadata={
+        "por_periodico": args.por_periodico,
+        "pares_area_estrato": True,
+        "valores_filtro": json.dumps({campo: sorted(valores) for campo, valores in valores_filtro.items()},
+                                     ensure_ascii=False),
+    })
+    gravar_indice_exato(collection)
+    verificar(model, cache)
+
+    if args.exportar_numpy:
+        exportar_numpy(abrir_colecao()[1], numpy_dir, args.dtype_numpy)
+    if args.exportar_shards:
+        exportar_shards(abrir_colecao()[1], shards_dir, args.exportar_shards, args.num_shards, args.dtype_numpy)
+
+    print("\nProcesso concluído. O ChromaDB está pronto para uso!")
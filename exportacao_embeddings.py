@@ -0,0 +1,77 @@
+import pandas as pd
+import numpy as np
+from busca import ExportacaoNumpy, colunas_numpy
+import json
+import os
+import shutil
+
+# --- Configurações ---
+# Diretório padrão da exportação (matriz de embeddings + tabela de metadados)
+exportacao_dir_padrao = "./sucupira_embeddings"
+
+
+def gravar_exportacao(metadados, embeddings, diretorio=exportacao_dir_padrao, dtype='float32', modelo=None,
+                      coluna_texto='texto_combinado'):
+    """
+    Grava os embeddings no formato do backend NumPy (busca.ExportacaoNumpy) e os metadados em 'metadados.parquet'
+
+    O diretório é o mesmo lido pelo busca.BuscadorNumpy (pode ser usado como 'numpy_dir'),
+    com a tabela completa de metadados ao lado: a linha i de 'embeddings.npy' corresponde à
+    linha i da tabela. A exportação é escrita em um diretório temporário e só substitui a
+    anterior ao final.
+
+    Args:
+        metadados (pd.DataFrame): Uma linha por embedding (o índice do DataFrame é descartado)
+        embeddings: Matriz com um embedding por linha
+        diretorio (str): Diretório de saída
+        dtype (str): 'float32' ou 'float16' (metade do tamanho, com perda de precisão)
+        modelo (str): Nome do modelo de embedding, guardado em 'meta.json'
+        coluna_texto (str): Coluna com o texto codificado (a coluna "Texto Combinado" da busca)
+    """
+    embeddings = np.asarray(embeddings)
+    if len(metadados) != len(embeddings):
+        raise ValueError(f"Metadata has {len(metadados)} rows but there are {len(embeddings)} embeddings")
+
+    temporario = diretorio + '.tmp'
+    if os.path.exists(temporario):
+        shutil.rmtree(temporario)
+
+    metadados = metadados.reset_index(drop=True)
+    campos = metadados.reindex(columns=[chave for chave in colunas_numpy if chave != "Texto Combinado"]).fillna("N/A")
+    # Mesmo ID da coleção do ChromaDB (ISSN + Área de Avaliação), usado nas consultas exatas
+    ids = (campos["ISSN"].astype(str).str.strip().str.upper() + "|" + campos["Área de Avaliação"].astype(str).str.strip())
+    exportacao = ExportacaoNumpy(temporario, len(embeddings), dtype, {'modelo': modelo})
+    exportacao.adicionar(embeddings, campos.to_dict(orient='records'), metadados[coluna_texto].tolist(), ids.tolist())
+    exportacao.finalizar()
+    metadados.to_parquet(os.path.join(temporario, 'metadados.parquet'), index=False)
+
+    if os.path.exists(diretorio):
+        shutil.rmtree(diretorio)
+    os.rename(temporario, diretorio)
+
+
+def carregar_exportacao(diretorio=exportacao_dir_padrao, colunas=None):
+    """
+    Abre uma exportação gravada por gravar_exportacao
+
+    A matriz é aberta por memory-map (somente leitura), sem copiar os vetores para a
+    memória: as páginas são lidas do disco sob demanda e compartilhadas entre processos.
+    Para buscar na exportação, use busca.BuscadorNumpy(diretorio).
+
+    Args:
+        diretorio (str): Diretório da exportação
+        colunas (list): Colunas de metadados a carregar (None = todas)
+
+    Returns:
+        (DataFrame de metadados, matriz de embeddings em memory-map, dicionário de meta.json)
+    """
+    if not os.path.exists(diretorio):
+        raise ValueError(f"Export directory '{diretorio}' not found")
+    with open(os.path.join(diretorio, 'meta.json'), encoding='utf-8') as arquivo:
+        meta = json.load(arquivo)
+    embeddings = np.load(os.path.join(diretorio, 'embeddings.npy'), mmap_mode='r')
+    metadados = pd.read_parquet(os.path.join(diretorio, 'metadados.parquet'), columns=colunas, memory_map=True)
+    if len(metadados) != len(embeddings) or len(embeddings) != meta['linhas']:
+        raise ValueError(f"Export '{diretorio}' is inconsistent: {len(metadados)} metadata rows, "
+                         f"{len(embeddings)} embeddings, {meta['linhas']} expected")
+    return metadados, embeddings, meta
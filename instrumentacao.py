@@ -0,0 +1,134 @@
+import numpy as np
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# --- Configurações ---
+# Limites (ms) das faixas do histograma de latência de cada etapa
+faixas_histograma_ms = [1, 5, 10, 50, 100, 500, 1000, 5000, 30000]
+
+# Desligada por padrão: span() e contar() só fazem uma verificação de booleano
+ativo = False
+_spans = []
+_contadores = {}
+_trava = threading.Lock()
+_inicio = time.perf_counter()
+_nulo = nullcontext()
+
+
+def ativar():
+    """
+    Liga a instrumentação e descarta o que foi registrado antes
+    """
+    global ativo, _inicio
+    with _trava:
+        _spans.clear()
+        _contadores.clear()
+        _inicio = time.perf_counter()
+    ativo = True
+
+
+class _Span:
+    __slots__ = ("nome", "atributos", "inicio")
+
+    def __init__(self, nome, atributos):
+        self.nome = nome
+        self.atributos = atributos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        fim = time.perf_counter()
+        if tipo is not None:
+            self.atributos["erro"] = tipo.__name__
+        with _trava:
+            _spans.append((self.nome, self.inicio - _inicio, fim - self.inicio, threading.get_ident(), self.atributos))
+        return False
+
+
+def span(nome, **atributos):
+    """
+    Mede a duração de um bloco 'with' como uma etapa do fluxo
+
+    Ex.: with span("busca.indice", consultas=3): ...
+    """
+    if not ativo:
+        return _nulo
+    return _Span(nome, atributos)
+
+
+def contar(nome, valor=1):
+    """
+    Soma 'valor' ao contador 'nome' (acertos de cache, bytes baixados, tokens...)
+    """
+    if not ativo:
+        return
+    with _trava:
+        _contadores[nome] = _contadores.get(nome, 0) + valor
+
+
+def resumo():
+    """
+    Agrega as durações registradas por etapa
+
+    Returns:
+        Dicionário etapa -> chamadas, total, p50/p95/p99/máximo (ms) e histograma por faixa
+    """
+    with _trava:
+        duracoes = {}
+        for nome, _, duracao, _, _ in _spans:
+            duracoes.setdefault(nome, []).append(duracao * 1000)
+
+    etapas = {}
+    for nome, valores in duracoes.items():
+        valores = np.asarray(valores)
+        p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+        contagens = np.bincount(np.searchsorted(faixas_histograma_ms, valores), minlength=len(faixas_histograma_ms) + 1)
+        etapas[nome] = {
+            "chamadas": len(valores),
+            "total_ms": float(valores.sum()),
+            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+            "max_ms": float(valores.max()),
+            "histograma": contagens.tolist()
+        }
+    return etapas
+
+
+def imprimir_resumo():
+    """
+    Mostra a latência de cada etapa (ordenadas pelo tempo total) e os contadores
+    """
+    etapas = resumo()
+    rotulos = [f"<{faixa}ms" for faixa in faixas_histograma_ms] + [f">={faixas_histograma_ms[-1]}ms"]
+    print("\nLatência por etapa:")
+    print(f"  {'etapa':<24} {'chamadas':>8} {'total':>10} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}")
+    for nome, etapa in sorted(etapas.items(), key=lambda item: item[1]["total_ms"], reverse=True):
+        print(f"  {nome:<24} {etapa['chamadas']:>8} {etapa['total_ms'] / 1000:>9.2f}s "
+              f"{etapa['p50_ms']:>7.1f}ms {etapa['p95_ms']:>7.1f}ms {etapa['p99_ms']:>7.1f}ms {etapa['max_ms']:>7.1f}ms")
+        faixas = ", ".join(f"{rotulo}: {n}" for rotulo, n in zip(rotulos, etapa["histograma"]) if n)
+        print(f"  {'':<24} {faixas}")
+    if _contadores:
+        print("Contadores:")
+        for nome, valor in sorted(_contadores.items()):
+            print(f"  {nome:<32} {valor}")
+
+
+def gravar_trace(caminho):
+    """
+    Grava os spans no formato Trace Event (abre no chrome://tracing ou no Perfetto),
+    com o resumo por etapa e os contadores no mesmo arquivo
+    """
+    with _trava:
+        eventos = [
+            {"name": nome, "ph": "X", "ts": inicio * 1e6, "dur": duracao * 1e6, "pid": os.getpid(), "tid": thread,
+             "args": atributos}
+            for nome, inicio, duracao, thread, atributos in _spans
+        ]
+        contadores = dict(_contadores)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump({"traceEvents": eventos, "contadores": contadores, "etapas": resumo()},
+                  arquivo, ensure_ascii=False, default=str)
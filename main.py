@@ -1,150 +1,136 @@
-from crewai import Agent, Task, Crew, Process, LLM
-from crewai.tools import BaseTool
-from typing import Optional
-import requests
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from langchain_community.vectorstores import Chroma
-import os
+from typing import Optional, List, Any
+from periodicos import BuscaPeriodicos, InfoPeriodicos, criar_ferramentas, executar_pipeline, formato_saida
+from cache_llm import criar_llm
+import instrumentacao
+import argparse
+import time
 
-llm = LLM(model="ollama/llama3.2:3b", base_url="http://localhost:11434")
+# Respostas do LLM ficam em cache no disco (cache_llm.sqlite3); prompts repetidos não passam pelo modelo.
+# O LLM só é criado quando é usado (agente ou --resumo), então o --pipeline sem resumo não abre o cache nem importa o crewai.
+modelo_llm = "ollama/llama3.2:3b"
+url_llm = "http://localhost:11434"
 area = "Computação e Medicina"
+# Backend de busca, modelo de embedding, e-mail do Crossref e formato da saída das ferramentas: ver periodicos.py
 
-class JournalInfoTool(BaseTool):
-    name: str = "Journal Information"
-    description: str = "Retrieves detailed information about academic journals using their ISSN. Returns title, publisher, total articles, and active articles from Crossref API."
-    
-    def _run(self, issn: str) -> str:
-        """
-        Retrieves journal information from Crossref API using ISSN
-        
-        Args:
-            issn: The ISSN of the journal
-            
-        Returns:
-            Formatted string with journal information
-        """
-        url = f"https://api.crossref.org/journals/{issn}"
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            message = data.get("message", {})
-            journal_info = {
-                "title": message.get("title", "Não disponível"),
-                "publisher": message.get("publisher", "Não disponível"),
-                "ISSN": message.get("ISSN", []),
-                "total_articles": message.get("counts", {}).get("total-dois", 0),
-                "active_articles": message.get("counts", {}).get("current-dois", 0)
-            }
-            
-            formatted_output = (
-                f"Informações do Periódico:\n"
-                f"Título: {journal_info['title']}\n"
-                f"Editora: {journal_info['publisher']}\n"
-                f"ISSN: {', '.join(journal_info['ISSN'])}\n"
-                f"Total de Artigos: {journal_info['total_articles']}\n"
-                f"Artigos Ativos: {journal_info['active_articles']}"
-            )
-            
-            return formatted_output
-            
-        except requests.exceptions.RequestException as e:
-            return f"Erro ao buscar informações do periódico: {str(e)}"
+def executar_crew(search_tool: BuscaPeriodicos, info_tool: InfoPeriodicos, area: str, llm):
+    """
+    Runs the original workflow, with the LLM agent deciding the tool calls
 
-class JournalSearchTool(BaseTool):
-    name: str = "Journal Search"
-    description: str = "Searches for academic journals in the Sucupira database based on similarity to the query. Returns journal titles, evaluation areas, ISSN, Qualis rating, and similarity scores."
-    
-    chroma_db_dir: str = "./sucupira_chroma_db"
-    embedding_model_name: str = 'paraphrase-MiniLM-L6-v2'
-    embedding_function: Optional[SentenceTransformerEmbeddings] = None
-    vectorstore: Optional[Chroma] = None
-    
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        if not os.path.exists(self.chroma_db_dir):
-            raise ValueError(f"Database directory '{self.chroma_db_dir}' not found")
-            
-        self.embedding_function = SentenceTransformerEmbeddings(model_name=self.embedding_model_name)
-        self.vectorstore = Chroma(
-            persist_directory=self.chroma_db_dir,
-            embedding_function=self.embedding_function
-        )
-    
-    def _run(self, query: str, k: Optional[int] = 5) -> str:
-        """
-        Searches for journals similar to the query
-        
-        Args:
-            query: The search query (journal name, area, etc.)
-            k: Number of results to return (default 5)
-            
-        Returns:
-            Formatted string with search results
-        """
-        try:
-            k = int(k) if k else 5
-            results = self.vectorstore.similarity_search_with_score(query, k=k)
-            
-            if not results:
-                return "Nenhum periódico encontrado para sua busca."
-                
-            output = []
-            for doc, score in results:
-                output.append({
-                    "Title": doc.metadata.get("Título", "N/A"),
-                    "Evaluation Area": doc.metadata.get("Área de Avaliação", "N/A"),
-                    "ISSN": doc.metadata.get("ISSN", "N/A"),
-                    "Qualis Rating": doc.metadata.get("Estrato", "N/A"),
-                    "Similarity Score": float(score)
-                })
-            
-            formatted_results = []
-            for i, res in enumerate(output, 1):
-                formatted = f"\n{i}. {res['Title']}\n"
-                formatted += f"   Área: {res['Evaluation Area']}\n"
-                formatted += f"   ISSN: {res['ISSN']}\n"
-                formatted += f"   Qualis: {res['Qualis Rating']}\n"
-                formatted += f"   Similaridade: {res['Similarity Score']:.3f}\n"
-                formatted_results.append(formatted)
-            
-            return "Resultados da busca de periódicos:\n" + "\n".join(formatted_results)
-            
-        except Exception as e:
-            return f"Erro ao buscar periódicos: {str(e)}"
+    The crewai tools are thin wrappers over the crewai-free classes in periodicos.py,
+    defined here so that crewai is only imported when the agent runs.
+    """
+    from crewai import Agent, Task, Crew, Process
+    from crewai.tools import BaseTool
+
+    class JournalInfoTool(BaseTool):
+        name: str = InfoPeriodicos.nome
+        description: str = "Retrieves detailed information about academic journals using their ISSN. Returns title, publisher, total articles, and active articles from Crossref API. To look up several journals in one call, pass all ISSNs in 'issns' (or separate them with commas in 'issn')."
+
+        info: Optional[Any] = None
+
+        def _run(self, issn: str = "", issns: Optional[List[str]] = None) -> str:
+            """
+            Retrieves journal information from Crossref API using ISSN
+
+            Args:
+                issn: The ISSN of the journal; several ISSNs can be separated by commas
+                issns: Optional list of ISSNs fetched concurrently in one call
 
-# Create researcher agent with both tools
-researcher = Agent(
-    role='Especialista em Periódicos Científicos',
-    goal='Identificar e detalhar informações sobre revistas científicas relevantes nas áreas de ' + area,
-    backstory='Um pesquisador experiente com profundo conhecimento em bases de dados acadêmicas, focado em encontrar periódicos de alta qualidade para publicação e análise de dados.',
-    tools=[JournalSearchTool(), JournalInfoTool()],
-    llm=llm,
-    verbose=True
-)
+            Returns:
+                Formatted string with journal information
+            """
+            return self.info.executar(issn, issns)
 
-# Create tasks
-search_task = Task(
-    description='Listar os 10 periódicos mais relevantes nas áreas de ' + area + ', incluindo seus ISSNs.',
-    agent=researcher,
-    expected_output='Uma lista detalhada com os 10 periódicos mais relevantes para as áreas especificadas, contendo Título, Área de Avaliação, ISSN e Qualis Rating de cada um.'
-)
+    class JournalSearchTool(BaseTool):
+        name: str = BuscaPeriodicos.nome
+        description: str = "Searches for academic journals in the Sucupira database based on similarity to the query. Returns journal titles, evaluation areas, ISSN, Qualis rating, and similarity scores. An ISSN (e.g. 2236-6695) returns that journal directly, and an exact journal title is listed first. To search several areas in one call, pass a list in 'queries' (or separate them with ';' in 'query'); set 'merge' to true to get a single list without repeated ISSNs. Use 'estrato' (e.g. [\"A1\", \"A2\"]) and 'area_avaliacao' (e.g. [\"MEDICINA I\"]) to restrict the search to those Qualis ratings and evaluation areas."
 
-info_task = Task(
-    description='Para cada ISSN identificado na tarefa anterior, obter informações detalhadas de cada um dos 10 periódicos',
-    agent=researcher,
-    expected_output='Uma lista detalhada com Informações completas de cada um dos 10 periódicos, incluindo a Editora, o Total de Artigos publicados e o número de Artigos Ativos.'
-)
+        busca: Optional[Any] = None
 
-# Create and run crew
-crew = Crew(
-    agents=[researcher],
-    tasks=[search_task, info_task],
-    process=Process.sequential,
-    verbose=True,
-    llm=llm
-)
+        def _run(self, query: str = "", k: Optional[int] = 5, queries: Optional[List[str]] = None, merge: bool = False,
+                 estrato: Optional[List[str]] = None, area_avaliacao: Optional[List[str]] = None) -> str:
+            """
+            Searches for journals similar to the query
 
-result = crew.kickoff()
-print("\nResultado Final:", result)
\ No newline at end of file
+            Args:
+                query: The search query (journal name, area, etc.); several queries can be separated by ';'
+                k: Number of results to return per query (default 5)
+                queries: Optional list of queries searched together in one batch
+                merge: If True, merges the results of all queries without repeated ISSNs
+                estrato: Optional list of Qualis ratings to keep (e.g. ["A1", "A2"])
+                area_avaliacao: Optional list of evaluation areas to keep (e.g. ["MEDICINA I"])
+
+            Returns:
+                Formatted string with search results
+            """
+            return self.busca.executar(query, k, queries, merge, estrato, area_avaliacao)
+    
+    researcher = Agent(
+        role='Especialista em Periódicos Científicos',
+        goal='Identificar e detalhar informações sobre revistas científicas relevantes nas áreas de ' + area,
+        backstory='Um pesquisador experiente com profundo conhecimento em bases de dados acadêmicas, focado em encontrar periódicos de alta qualidade para publicação e análise de dados.',
+        tools=[JournalSearchTool(busca=search_tool), JournalInfoTool(info=info_tool)],
+        llm=llm,
+        verbose=True
+    )
+    
+    search_task = Task(
+        description='Listar os 10 periódicos mais relevantes nas áreas de ' + area + ', incluindo seus ISSNs. Quando houver mais de uma área, faça uma única chamada ao Journal Search passando cada área na lista queries.',
+        agent=researcher,
+        expected_output='Uma lista detalhada com os 10 periódicos mais relevantes para as áreas especificadas, contendo Título, Área de Avaliação, ISSN e Qualis Rating de cada um.'
+    )
+    
+    info_task = Task(
+        description='Para cada ISSN identificado na tarefa anterior, obter informações detalhadas de cada um dos 10 periódicos. Faça uma única chamada ao Journal Information passando todos os ISSNs na lista issns.',
+        agent=researcher,
+        expected_output='Uma lista detalhada com Informações completas de cada um dos 10 periódicos, incluindo a Editora, o Total de Artigos publicados e o número de Artigos Ativos.'
+    )
+    
+    crew = Crew(
+        agents=[researcher],
+        tasks=[search_task, info_task],
+        process=Process.sequential,
+        verbose=True,
+        llm=llm
+    )
+    return crew.kickoff()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca periódicos relevantes para as áreas configuradas e obtém seus dados no Crossref.")
+    parser.add_argument('--area', default=area, help=f"Áreas de interesse (padrão: {area}).")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Executa busca e consulta ao Crossref diretamente, sem o agente (o LLM não é usado).")
+    parser.add_argument('--resumo', action='store_true',
+                        help="No modo --pipeline, usa o LLM apenas para resumir o relatório final.")
+    parser.add_argument('-k', type=int, default=10, help="Número de periódicos no modo --pipeline (padrão: 10).")
+    parser.add_argument('--trace', default=None, metavar='ARQUIVO',
+                        help="Mede cada etapa (LLM, codificação, busca, Crossref) e grava o trace neste arquivo JSON.")
+    parser.add_argument('--compacto', action='store_true',
+                        help="As ferramentas devolvem ao agente a saída compacta (JSON lines com chaves curtas, menos tokens).")
+    parser.add_argument('--replay', action='store_true',
+                        help="Usa apenas respostas do LLM já gravadas em cache; falha se alguma chamada não estiver gravada.")
+    args = parser.parse_args()
+    # O --pipeline sem --resumo não usa o LLM
+    llm = None if args.pipeline and not args.resumo else criar_llm(model=modelo_llm, base_url=url_llm, replay=args.replay)
+    if args.trace:
+        instrumentacao.ativar()
+    
+    search_tool, info_tool = criar_ferramentas(formato_saida="compacto" if args.compacto else formato_saida)
+    # Índice e modelo carregam em segundo plano enquanto o agente é montado e o LLM responde
+    search_tool.aquecer()
+    inicio = time.perf_counter()
+    if args.pipeline:
+        result = executar_pipeline(search_tool, info_tool, args.area, args.k, args.resumo, llm=llm)
+    else:
+        result = executar_crew(search_tool, info_tool, args.area, llm)
+    print("\nResultado Final:", result)
+    print(f"Tempo total: {time.perf_counter() - inicio:.1f}s")
+    print("Cache de consultas do Journal Search:", search_tool.estatisticas_cache())
+    for ferramenta in (search_tool, info_tool):
+        print(f"Saídas do {ferramenta.nome}: {ferramenta.saidas} chamadas, ~{ferramenta.tokens_saida} tokens")
+    if llm is not None:
+        print("Cache de respostas do LLM:", llm.cache.estatisticas())
+    if args.trace:
+        instrumentacao.imprimir_resumo()
+        instrumentacao.gravar_trace(args.trace)
+        print(f"Trace salvo em '{args.trace}' (abra em chrome://tracing ou https://ui.perfetto.dev).")
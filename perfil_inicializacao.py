@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# --- Configurações ---
+# Módulos do projeto cujo tempo de importação é medido (cada um em um processo novo)
+modulos_perfil = ["cache_consultas", "cache_embeddings", "busca", "cliente_crossref", "periodicos", "main"]
+# Quantidade de dependências mais pesadas listadas por módulo
+top_dependencias = 8
+# Consulta usada para medir o tempo até a primeira resposta
+consulta_teste = "medicina"
+
+
+def medir_importacao(modulo):
+    """
+    Importa o módulo em um processo novo com 'python -X importtime'
+
+    Returns:
+        Dicionário com o tempo total (segundos) e o tempo acumulado das dependências de primeiro nível
+    """
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                              capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if processo.returncode != 0:
+        return {"erro": processo.stderr.strip().splitlines()[-1]}
+
+    total = 0.0
+    dependencias = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "[us]" in linha:
+            continue
+        _, acumulado, nome = linha[len("import time:"):].split("|")
+        segundos = int(acumulado) / 1e6
+        # O nível de aninhamento vem da indentação do nome (2 espaços por nível);
+        # as dependências de um módulo aparecem logo antes dele, um nível abaixo
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        nome = nome.strip()
+        if nivel == 0:
+            if nome == modulo:
+                total = segundos
+                break
+            dependencias = {}
+        elif nivel == 1 and "." not in nome:
+            dependencias[nome] = segundos
+
+    mais_pesadas = sorted(dependencias.items(), key=lambda item: item[1], reverse=True)[:top_dependencias]
+    return {"segundos": total, "dependencias": dict(mais_pesadas)}
+
+
+def medir_ferramentas():
+    """
+    Mede, no processo atual, cada etapa até o Journal Search responder a primeira consulta
+
+    Returns:
+        Dicionário etapa -> segundos
+    """
+    etapas = {}
+    inicio = time.perf_counter()
+    from periodicos import criar_ferramentas
+    etapas["importar_periodicos"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    search_tool, _ = criar_ferramentas()
+    etapas["criar_ferramentas"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    search_tool.carregar()
+    etapas["carregar_indice"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    search_tool.embedding_function.model
+    etapas["carregar_modelo"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    search_tool.buscar_lote([consulta_teste])
+    etapas["primeira_consulta"] = time.perf_counter() - inicio
+    return etapas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o tempo de importação dos módulos e de inicialização do Journal Search.")
+    parser.add_argument('--sem-ferramentas', action='store_true',
+                        help="Mede apenas as importações (não carrega índice nem modelo).")
+    parser.add_argument('--json', default=None,
+                        help="Grava o relatório em JSON neste arquivo (para comparar entre versões).")
+    args = parser.parse_args()
+
+    relatorio = {"importacao": {}, "ferramentas": {}}
+    print("Tempo de importação (processo novo, python -X importtime):")
+    for modulo in modulos_perfil:
+        resultado = medir_importacao(modulo)
+        relatorio["importacao"][modulo] = resultado
+        if "erro" in resultado:
+            print(f"  {modulo:<18} erro: {resultado['erro']}")
+            continue
+        pesadas = ", ".join(f"{nome} {segundos:.2f}s" for nome, segundos in resultado["dependencias"].items())
+        print(f"  {modulo:<18} {resultado['segundos']:6.2f}s  ({pesadas})")
+
+    if not args.sem_ferramentas:
+        print("\nInicialização do Journal Search:")
+        try:
+            relatorio["ferramentas"] = medir_ferramentas()
+        except Exception as e:
+            relatorio["ferramentas"] = {"erro": str(e)}
+            print(f"  erro: {e}")
+        else:
+            for etapa, segundos in relatorio["ferramentas"].items():
+                print(f"  {etapa:<18} {segundos:6.2f}s")
+            print(f"  {'total':<18} {sum(relatorio['ferramentas'].values()):6.2f}s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nRelatório salvo em '{args.json}'.")
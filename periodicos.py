@@ -0,0 +1,428 @@
+from typing import Optional, List
+import requests
+from cache_embeddings import EmbeddingsComCache
+from cache_consultas import CacheLRU, normalizar_consulta, normalizar_issn
+from busca import criar_buscador, chave_filtros, completar_com_exatos, IndiceExato
+from cliente_crossref import CacheCrossref, ClienteCrossref
+from instrumentacao import span, contar
+from saida_compacta import estimar_tokens, formatar_busca_compacta, formatar_info_compacta
+import os
+import re
+import threading
+
+# --- Configurações ---
+backend = "chroma"  # "chroma", "numpy" (busca exata, requer criar_embbendings_chroma.py --exportar-numpy) ou "shards" (requer --exportar-shards)
+crossref_mailto = None  # E-mail de contato enviado ao Crossref (acesso ao "polite pool"; sem ele valem os limites menores do "public pool")
+embedding_model_name = 'paraphrase-MiniLM-L6-v2'  # Deve ser o mesmo modelo usado em criar_embbendings_chroma.py
+cache_dir = "./cache_embeddings"  # Cache de embeddings compartilhado com os outros scripts
+modo_codificador = "float"  # "float" ou "int8" (modelo quantizado, mais rápido em CPU; ver codificador.py)
+formato_saida = "texto"  # "texto" ou "compacto" (JSON lines com chaves curtas, menos tokens; ver main.py --compacto)
+orcamento_tokens = 800  # Máximo de tokens estimados da saída do Journal Search no formato compacto (None = sem limite)
+
+
+class InfoPeriodicos:
+    """
+    Journal Information: looks journals up in Crossref by ISSN
+
+    Plain class without crewai, used by the agent tool in main.py and directly by
+    the pipeline, the search service and the multi-area reports.
+    """
+    nome = "Journal Information"
+
+    def __init__(self, cache_crossref_file: str = "./cache_crossref.sqlite3", cache_ttl: float = 7 * 24 * 3600,
+                 cache_ttl_negativo: float = 24 * 3600, mailto: Optional[str] = None,
+                 taxa: Optional[float] = None, formato_saida: str = "texto", semaforo=None):
+        self.formato_saida = formato_saida
+        self.tokens_saida = 0
+        self.saidas = 0
+        # Respostas do Crossref ficam em cache no disco; uma execução repetida não acessa a rede
+        cache = CacheCrossref(cache_crossref_file, cache_ttl, cache_ttl_negativo)
+        self.cliente = ClienteCrossref(cache, mailto=mailto, taxa=taxa, semaforo=semaforo)
+
+    def _formatar(self, issn: str, status: Optional[int], journal_info) -> str:
+        if status is None:
+            return f"Erro ao buscar informações do periódico: {journal_info}"
+        if status == 404:
+            return f"Erro ao buscar informações do periódico: ISSN {issn} não encontrado no Crossref"
+
+        return (
+            f"Informações do Periódico:\n"
+            f"Título: {journal_info['title']}\n"
+            f"Editora: {journal_info['publisher']}\n"
+            f"ISSN: {', '.join(journal_info['ISSN'])}\n"
+            f"Total de Artigos: {journal_info['total_articles']}\n"
+            f"Artigos Ativos: {journal_info['active_articles']}"
+        )
+
+    def executar(self, issn: str = "", issns: Optional[List[str]] = None) -> str:
+        """
+        Retrieves journal information from Crossref API using ISSN
+
+        Args:
+            issn: The ISSN of the journal; several ISSNs can be separated by commas
+            issns: Optional list of ISSNs fetched concurrently in one call
+
+        Returns:
+            Formatted string with journal information
+        """
+        with span("journal_info"):
+            todos = [i.strip() for i in (issns or []) + issn.replace(";", ",").split(",") if i and i.strip()]
+            if not todos:
+                return self._registrar("Erro ao buscar informações do periódico: nenhum ISSN informado")
+            if len(todos) == 1:
+                try:
+                    respostas = {todos[0]: self.cliente.buscar(todos[0])}
+                except requests.exceptions.RequestException as e:
+                    return self._registrar(f"Erro ao buscar informações do periódico: {str(e)}")
+            else:
+                respostas = self.cliente.buscar_lote(todos)
+
+            unicos = list(dict.fromkeys(todos))
+            if self.formato_saida == "compacto":
+                return self._registrar(formatar_info_compacta([(i, *respostas[i]) for i in unicos]))
+            return self._registrar("\n\n".join(self._formatar(i, *respostas[i]) for i in unicos))
+
+    def _registrar(self, saida: str) -> str:
+        # Tamanho da saída que volta para o contexto do LLM
+        tokens = estimar_tokens(saida)
+        self.tokens_saida += tokens
+        self.saidas += 1
+        contar("saida.tokens_journal_info", tokens)
+        return saida
+
+
+class BuscaPeriodicos:
+    """
+    Journal Search: similarity search over the Sucupira index
+
+    Plain class without crewai, used by the agent tool in main.py and directly by
+    the pipeline, the search service and the multi-area reports.
+    """
+    nome = "Journal Search"
+
+    def __init__(self, backend: str = "chroma", chroma_db_dir: str = "./sucupira_chroma_db",
+                 numpy_dir: str = "./sucupira_numpy", shards_dir: str = "./sucupira_shards",
+                 indice_exato_file: str = "./sucupira_indice_exato.sqlite3",
+                 embedding_model_name: str = embedding_model_name, cache_dir: str = cache_dir,
+                 modo_codificador: str = "float", cache_max_itens: int = 256, cache_ttl: float = 600.0,
+                 cache_crossref_file: str = "./cache_crossref.sqlite3",
+                 cliente_crossref: Optional[ClienteCrossref] = None, formato_saida: str = "texto",
+                 orcamento_tokens: Optional[int] = None):
+        self.backend = backend
+        self.chroma_db_dir = chroma_db_dir
+        self.numpy_dir = numpy_dir
+        self.shards_dir = shards_dir
+        self.indice_exato_file = indice_exato_file
+        self.cliente_crossref = cliente_crossref
+        self.formato_saida = formato_saida
+        self.orcamento_tokens = orcamento_tokens
+        self.tokens_saida = 0
+        self.saidas = 0
+        self.buscador = None
+        self.indice_exato = None
+        # O índice é carregado no primeiro uso (ou por aquecer), não na criação da ferramenta
+        self.trava_carga = threading.Lock()
+        # Consultas repetidas reaproveitam o embedding do cache em disco, sem passar pelo modelo
+        self.embedding_function = EmbeddingsComCache(embedding_model_name, cache_dir, modo_codificador)
+        # O agente costuma repetir a mesma consulta (ou variações de caixa, acentos e espaços)
+        self.cache_vetores = CacheLRU(cache_max_itens, cache_ttl)
+        self.cache_resultados = CacheLRU(cache_max_itens, cache_ttl)
+        # Dados do Crossref baixados por prefetch_crossref.py são anexados aos resultados sem acessar a rede
+        self.enriquecimento = CacheCrossref(cache_crossref_file) if os.path.exists(cache_crossref_file) else None
+
+    def carregar(self):
+        """
+        Loads the search index and the exact-match index, once
+        """
+        with self.trava_carga:
+            if self.buscador is not None:
+                return
+            # ISSNs e títulos exatos são localizados pelo índice exato, que guarda só os IDs dos documentos
+            if os.path.exists(self.indice_exato_file):
+                self.indice_exato = IndiceExato(self.indice_exato_file)
+            # Backend escolhido na configuração: ChromaDB (HNSW), matriz NumPy em memory-map ou shards por área
+            self.buscador = criar_buscador(self.backend, self.chroma_db_dir, self.numpy_dir, self.shards_dir)
+
+    def aquecer(self) -> threading.Thread:
+        """
+        Loads the index and the embedding model in a background thread
+
+        The first search waits for the loading still in progress instead of repeating it.
+        """
+        def tarefa():
+            try:
+                self.carregar()
+                self.embedding_function.model
+            except Exception as e:
+                print(f"Erro ao carregar o índice de busca: {e}")
+
+        thread = threading.Thread(target=tarefa, daemon=True)
+        thread.start()
+        return thread
+
+    def estatisticas_cache(self) -> dict:
+        """
+        Returns the hit/miss counters of the query-vector and result caches
+        """
+        return {
+            "vetores": self.cache_vetores.estatisticas(),
+            "resultados": self.cache_resultados.estatisticas()
+        }
+
+    def buscar_lote(self, queries: List[str], k: int = 5, mesclar: bool = False, filtros: Optional[dict] = None) -> list:
+        """
+        Searches several queries with one batched encode and one batched index lookup
+
+        Queries that are an ISSN are answered from the exact-match index alone. A query
+        that is an exact journal title gets that journal first, filled up to k with
+        the vector search results.
+
+        Args:
+            queries: List of search queries
+            k: Number of results per query
+            mesclar: If True, merges all results into one list without repeated ISSNs
+            filtros: Optional filters by "Estrato" and "Área de Avaliação" (value or list of values)
+
+        Returns:
+            One result list per query, or a single merged list if mesclar is True
+        """
+        self.carregar()
+        chaves = [normalizar_consulta(query) for query in queries]
+        filtro = chave_filtros(filtros)
+        resultados = [self.cache_resultados.obter((chave, k, filtro)) for chave in chaves]
+        pendentes = [i for i, output in enumerate(resultados) if output is None]
+        contar("busca.cache_resultados_acertos", len(queries) - len(pendentes))
+
+        exatos = {}
+        if self.indice_exato is not None:
+            for i in list(pendentes):
+                encontrados = self.indice_exato.buscar(queries[i], self.buscador, k, filtros)
+                if not encontrados:
+                    continue
+                contar("busca.indice_exato_acertos")
+                if normalizar_issn(queries[i]) is not None:
+                    # Um ISSN identifica o periódico; a busca semântica não acrescentaria nada
+                    resultados[i] = self._converter(encontrados)
+                    pendentes.remove(i)
+                else:
+                    exatos[i] = encontrados
+
+        if pendentes:
+            vetores = [self.cache_vetores.obter(chaves[i]) for i in pendentes]
+            sem_vetor = [j for j, vetor in enumerate(vetores) if vetor is None]
+            contar("busca.cache_vetores_acertos", len(pendentes) - len(sem_vetor))
+            if sem_vetor:
+                novos = self.embedding_function.encode([queries[pendentes[j]] for j in sem_vetor])
+                for j, vetor in zip(sem_vetor, novos):
+                    vetores[j] = vetor
+                    self.cache_vetores.guardar(chaves[pendentes[j]], vetor)
+
+            with span("busca.indice", consultas=len(pendentes)):
+                encontrados = self.buscador.buscar(vetores, k, filtros)
+            for i, results in zip(pendentes, encontrados):
+                if i in exatos:
+                    results = completar_com_exatos(exatos[i], results, k)
+                output = self._converter(results)
+                resultados[i] = output
+                self.cache_resultados.guardar((chaves[i], k, filtro), output)
+
+        # Os próximos passos do agente costumam consultar no Crossref os ISSNs encontrados;
+        # baixá-los agora esconde a latência da rede atrás do tempo de resposta do LLM
+        if self.cliente_crossref is not None:
+            self.cliente_crossref.antecipar(res["ISSN"] for output in resultados for res in output)
+
+        if mesclar:
+            return mesclar_por_issn(resultados)
+        return resultados
+
+    def _converter(self, results: list) -> list:
+        output = []
+        for res in results:
+            output.append({
+                "Title": res["Título"],
+                "Evaluation Area": res["Área de Avaliação"],
+                "ISSN": res["ISSN"],
+                "Qualis Rating": res["Estrato"],
+                "Similarity Score": res["Score de Similaridade"]
+            })
+            entrada = self.enriquecimento.obter(res["ISSN"]) if self.enriquecimento is not None else None
+            if entrada is not None and entrada[0] == 200:
+                output[-1].update({
+                    "Publisher": entrada[1]["publisher"],
+                    "Total Articles": entrada[1]["total_articles"],
+                    "Active Articles": entrada[1]["active_articles"]
+                })
+        return output
+
+    def _buscar(self, query: str, k: int, filtros: Optional[dict] = None) -> list:
+        """
+        Runs the similarity search for a single query
+        """
+        return self.buscar_lote([query], k, filtros=filtros)[0]
+
+    def _formatar(self, output: list) -> str:
+        with span("busca.formatacao"):
+            formatted_results = []
+            for i, res in enumerate(output, 1):
+                formatted = f"\n{i}. {res['Title']}\n"
+                formatted += f"   Área: {res['Evaluation Area']}\n"
+                formatted += f"   ISSN: {res['ISSN']}\n"
+                formatted += f"   Qualis: {res['Qualis Rating']}\n"
+                formatted += f"   Similaridade: {res['Similarity Score']:.3f}\n"
+                if "Publisher" in res:
+                    formatted += f"   Editora: {res['Publisher']}\n"
+                    formatted += f"   Artigos (total/ativos): {res['Total Articles']}/{res['Active Articles']}\n"
+                formatted_results.append(formatted)
+            return "\n".join(formatted_results)
+
+    def executar(self, query: str = "", k: Optional[int] = 5, queries: Optional[List[str]] = None, merge: bool = False,
+                 estrato: Optional[List[str]] = None, area_avaliacao: Optional[List[str]] = None) -> str:
+        """
+        Searches for journals similar to the query
+
+        Args:
+            query: The search query (journal name, area, etc.); several queries can be separated by ';'
+            k: Number of results to return per query (default 5)
+            queries: Optional list of queries searched together in one batch
+            merge: If True, merges the results of all queries without repeated ISSNs
+            estrato: Optional list of Qualis ratings to keep (e.g. ["A1", "A2"])
+            area_avaliacao: Optional list of evaluation areas to keep (e.g. ["MEDICINA I"])
+
+        Returns:
+            Formatted string with search results
+        """
+        with span("journal_search"):
+            try:
+                k = int(k) if k else 5
+                filtros = {"Estrato": estrato, "Área de Avaliação": area_avaliacao}
+                consultas = [q.strip() for q in (queries or []) + query.split(";") if q and q.strip()]
+                if not consultas:
+                    return self._registrar("Nenhum periódico encontrado para sua busca.")
+
+                if merge:
+                    secoes = [(None, self.buscar_lote(consultas, k, mesclar=True, filtros=filtros))]
+                elif len(consultas) == 1:
+                    secoes = [(None, self._buscar(consultas[0], k, filtros))]
+                else:
+                    secoes = list(zip(consultas, self.buscar_lote(consultas, k, filtros=filtros)))
+                return self._registrar(self._montar_saida(secoes))
+
+            except Exception as e:
+                return f"Erro ao buscar periódicos: {str(e)}"
+
+    def _montar_saida(self, secoes: list) -> str:
+        """
+        Formats the result sections (query or None, results) as prose or in the compact format
+        """
+        if len(secoes) == 1 and not secoes[0][1]:
+            return "Nenhum periódico encontrado para sua busca."
+        if self.formato_saida == "compacto":
+            return formatar_busca_compacta(secoes, self.orcamento_tokens)
+        if len(secoes) == 1 and secoes[0][0] is None:
+            return "Resultados da busca de periódicos:\n" + self._formatar(secoes[0][1])
+
+        partes = []
+        for consulta, output in secoes:
+            corpo = self._formatar(output) if output else "\nNenhum periódico encontrado para sua busca.\n"
+            partes.append(f"Resultados da busca de periódicos para '{consulta}':\n" + corpo)
+        return "\n".join(partes)
+
+    def _registrar(self, saida: str) -> str:
+        # Tamanho da saída que volta para o contexto do LLM
+        tokens = estimar_tokens(saida)
+        self.tokens_saida += tokens
+        self.saidas += 1
+        contar("saida.tokens_journal_search", tokens)
+        return saida
+
+
+def mesclar_por_issn(resultados: list) -> list:
+    """
+    Merges several result lists keeping only the best-scored entry of each ISSN
+
+    Args:
+        resultados: Result lists returned by BuscaPeriodicos.buscar_lote
+
+    Returns:
+        Single list ordered by similarity score (smaller distance first)
+    """
+    melhores = {}
+    for output in resultados:
+        for res in output:
+            atual = melhores.get(res["ISSN"])
+            if atual is None or res["Similarity Score"] < atual["Similarity Score"]:
+                melhores[res["ISSN"]] = res
+    return sorted(melhores.values(), key=lambda res: res["Similarity Score"])
+
+
+def criar_ferramentas(taxa_crossref: Optional[float] = None, semaforo_crossref=None,
+                      backend: str = backend, antecipar: bool = True, formato_saida: str = formato_saida):
+    """
+    Creates the Journal Search and Journal Information tools sharing one Crossref client
+
+    Args:
+        taxa_crossref: Maximum Crossref requests per second made by this process (None = the pool limit)
+        semaforo_crossref: Semaphore shared by several processes capping their concurrent Crossref requests
+        backend: Search backend ("chroma", "numpy" or "shards")
+        antecipar: Whether Journal Search prefetches the Crossref data of the journals it finds
+        formato_saida: Tool output format, "texto" or "compacto"
+    """
+    info_tool = InfoPeriodicos(mailto=crossref_mailto, taxa=taxa_crossref, formato_saida=formato_saida,
+                               semaforo=semaforo_crossref)
+    # O Journal Search antecipa no cliente do Journal Information a consulta dos ISSNs encontrados
+    search_tool = BuscaPeriodicos(backend=backend, modo_codificador=modo_codificador,
+                                  cliente_crossref=info_tool.cliente if antecipar else None,
+                                  formato_saida=formato_saida, orcamento_tokens=orcamento_tokens)
+    return search_tool, info_tool
+
+
+def separar_areas(texto: str) -> List[str]:
+    """
+    Splits the configured areas ("Computação e Medicina", "Computação, Medicina") into separate queries
+    """
+    return [a.strip() for a in re.split(r",|;|\s+e\s+", texto) if a.strip()]
+
+
+def executar_pipeline(search_tool: BuscaPeriodicos, info_tool: InfoPeriodicos, area: str,
+                      k: int = 10, resumir: bool = False, consultas: Optional[List[str]] = None,
+                      filtros: Optional[dict] = None, llm=None) -> str:
+    """
+    Runs the search -> Crossref enrichment workflow directly, without the agent
+
+    The areas are searched in one batch and merged by ISSN, the ISSNs come straight
+    from the structured results and all of them are looked up in Crossref in one
+    concurrent batch. The LLM is only used, optionally, to summarize the report.
+
+    Args:
+        search_tool: Journal Search tool
+        info_tool: Journal Information tool
+        area: Areas of interest (several separated by ',' or ' e ')
+        k: Number of journals in the report
+        resumir: If True, appends a summary of the report written by 'llm'
+        consultas: Queries to search (default: the areas split from 'area')
+        filtros: Optional filters by "Estrato" and "Área de Avaliação"
+        llm: LLM used for the summary (see cache_llm.criar_llm); required if resumir is True
+
+    Returns:
+        Report with the search results followed by the Crossref information
+    """
+    consultas = consultas or separar_areas(area)
+    resultados = search_tool.buscar_lote(consultas, k, mesclar=True, filtros=filtros)[:k]
+    if not resultados:
+        return "Nenhum periódico encontrado para sua busca."
+
+    issns = [res["ISSN"] for res in resultados]
+    respostas = info_tool.cliente.buscar_lote(issns)
+
+    relatorio = (
+        f"Periódicos mais relevantes nas áreas de {area}:\n" + search_tool._formatar(resultados)
+        + "\n\n" + "\n\n".join(info_tool._formatar(issn, *respostas[issn]) for issn in issns)
+    )
+    if resumir:
+        resumo = llm.call([{
+            "role": "user",
+            "content": "Resuma em português o relatório abaixo sobre periódicos científicos, "
+                       "destacando os de melhor Qualis e maior número de artigos.\n\n" + relatorio
+        }])
+        relatorio += "\n\nResumo:\n" + str(resumo)
+    return relatorio
@@ -0,0 +1,98 @@
+import pandas as pd
+from cliente_crossref import CacheCrossref, ClienteCrossref, chave_issn, cache_crossref_padrao
+import argparse
+import time
+
+# --- Configurações ---
+# Nome do arquivo CSV de entrada
+input_csv_file = 'sucupira.csv'
+# ISSNs consultados por lote; cada lote é gravado no cache antes do próximo começar
+tamanho_lote = 200
+# Linhas do CSV lidas por vez ao listar os ISSNs
+tamanho_bloco_csv = 100000
+
+
+def listar_issns(caminho):
+    """
+    Lista os ISSNs distintos do CSV (normalizados), lendo apenas a coluna 'ISSN'
+    """
+    try:
+        leitor = pd.read_csv(caminho, usecols=['ISSN'], dtype=str, chunksize=tamanho_bloco_csv)
+    except FileNotFoundError:
+        print(f"Erro: O arquivo '{caminho}' não foi encontrado. Por favor, verifique o caminho.")
+        exit()
+
+    issns = {}
+    with leitor:
+        for bloco in leitor:
+            for issn in bloco['ISSN'].dropna():
+                issns.setdefault(chave_issn(issn), None)
+    return list(issns)
+
+
+def selecionar_pendentes(cache, issns, atualizar_vencidos=False):
+    """
+    Seleciona os ISSNs que ainda não estão no cache (ou vencidos, se 'atualizar_vencidos')
+
+    O próprio cache serve de checkpoint: ISSNs já gravados em uma execução anterior,
+    inclusive uma interrompida, são pulados.
+    """
+    pendentes = []
+    for issn in issns:
+        entrada = cache.obter(issn)
+        if entrada is None or (atualizar_vencidos and not entrada[2]):
+            pendentes.append(issn)
+    return pendentes
+
+
+def executar(cliente, pendentes, tamanho=tamanho_lote):
+    """
+    Consulta os ISSNs pendentes em lotes paralelos, mostrando o progresso
+
+    Returns:
+        Dicionário com a contagem de encontrados, não encontrados e erros
+    """
+    contagem = {"encontrados": 0, "nao_encontrados": 0, "erros": 0}
+    inicio = time.perf_counter()
+    for posicao in range(0, len(pendentes), tamanho):
+        respostas = cliente.buscar_lote(pendentes[posicao:posicao + tamanho], forcar=True)
+        for status, _ in respostas.values():
+            if status == 200:
+                contagem["encontrados"] += 1
+            elif status == 404:
+                contagem["nao_encontrados"] += 1
+            else:
+                contagem["erros"] += 1
+
+        feitos = min(posicao + tamanho, len(pendentes))
+        decorrido = time.perf_counter() - inicio
+        print(f"{feitos}/{len(pendentes)} ISSNs consultados ({feitos / decorrido:.1f} ISSNs/s) | "
+              f"encontrados: {contagem['encontrados']} | não encontrados: {contagem['nao_encontrados']} | "
+              f"erros: {contagem['erros']}")
+    return contagem
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Baixa antecipadamente os dados do Crossref de todos os ISSNs do dataset Sucupira.")
+    parser.add_argument('--csv', default=input_csv_file, help=f"Arquivo CSV de entrada (padrão: {input_csv_file}).")
+    parser.add_argument('--cache', default=cache_crossref_padrao,
+                        help=f"Arquivo SQLite onde os dados são gravados (padrão: {cache_crossref_padrao}).")
+    parser.add_argument('--mailto', default=None,
+                        help="E-mail de contato enviado ao Crossref (acesso ao \"polite pool\").")
+    parser.add_argument('--atualizar-vencidos', action='store_true',
+                        help="Consulta novamente os ISSNs cujas entradas passaram do TTL.")
+    args = parser.parse_args()
+
+    cache = CacheCrossref(args.cache)
+    cliente = ClienteCrossref(cache, mailto=args.mailto)
+
+    issns = listar_issns(args.csv)
+    pendentes = selecionar_pendentes(cache, issns, args.atualizar_vencidos)
+    print(f"{len(issns)} ISSNs distintos no CSV; {len(issns) - len(pendentes)} já estão no cache e {len(pendentes)} serão consultados.")
+
+    try:
+        executar(cliente, pendentes)
+    except KeyboardInterrupt:
+        print("\nInterrompido. Os lotes concluídos já estão no cache; execute novamente para continuar.")
+    else:
+        print(f"\nProcesso concluído. Dados do Crossref salvos em '{args.cache}'.")
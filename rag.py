@@ -1,58 +1,96 @@
-import pandas as pd
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from langchain_community.vectorstores import Chroma
+from cache_embeddings import EmbeddingsComCache
+from busca import criar_buscador, completar_com_exatos, IndiceExato
+from cache_consultas import normalizar_issn
 import os
+import threading
 
 # --- Configurações ---
 chroma_db_dir = "./sucupira_chroma_db"  # Deve ser o mesmo diretório usado no script anterior
 embedding_model_name = 'paraphrase-MiniLM-L6-v2'  # Deve ser o mesmo modelo usado no script anterior
+cache_dir = "./cache_embeddings"  # Cache de embeddings compartilhado com os outros scripts
+modo_codificador = "float"  # "float" ou "int8" (modelo quantizado, mais rápido em CPU; ver codificador.py)
+backend = "chroma"  # "chroma", "numpy" (busca exata, requer criar_embbendings_chroma.py --exportar-numpy) ou "shards" (requer --exportar-shards)
+numpy_dir = "./sucupira_numpy"  # Matriz exportada para o backend "numpy"
+shards_dir = "./sucupira_shards"  # Índice particionado exportado para o backend "shards"
+indice_exato_file = "./sucupira_indice_exato.sqlite3"  # Índice de ISSN e títulos exatos
 
-# 1. Carregar o ChromaDB
-print(f"Carregando o ChromaDB de '{chroma_db_dir}'...")
-if not os.path.exists(chroma_db_dir):
-    print(f"Erro: O diretório '{chroma_db_dir}' não foi encontrado.")
-    exit()
-
+# 1. Carregar o índice de busca
 # Carregar a função de embedding (deve ser a mesma usada para criar o ChromaDB)
-embedding_function = SentenceTransformerEmbeddings(model_name=embedding_model_name)
+# Consultas já feitas antes são respondidas pelo cache, sem passar pelo modelo
+embedding_function = EmbeddingsComCache(embedding_model_name, cache_dir, modo_codificador)
+buscador = None
+indice_exato = None
+erro_carregamento = None
 
-# Carregar o VectorStore
-vectorstore = Chroma(
-    persist_directory=chroma_db_dir,
-    embedding_function=embedding_function
-)
-print("ChromaDB carregado com sucesso!")
+def carregar():
+    """
+    Carrega o índice, o índice exato e o modelo (executada em segundo plano)
+    """
+    global buscador, indice_exato, erro_carregamento
+    try:
+        # ISSNs e títulos exatos são localizados por este índice, que guarda só os IDs dos documentos
+        indice_exato = IndiceExato(indice_exato_file) if os.path.exists(indice_exato_file) else None
+        buscador = criar_buscador(backend, chroma_db_dir, numpy_dir, shards_dir)
+        embedding_function.model
+    except Exception as e:
+        # Qualquer falha (índice ausente, dependência faltando, modelo indisponível) é mostrada na primeira consulta
+        erro_carregamento = e
+
+# O índice e o modelo carregam enquanto o usuário digita a primeira consulta
+print(f"Carregando o índice de busca (backend '{backend}') em segundo plano...")
+carregamento = threading.Thread(target=carregar, daemon=True)
+carregamento.start()
+
+def aguardar_carregamento():
+    """
+    Espera o carregamento em segundo plano terminar (encerra o programa em caso de erro)
+    """
+    carregamento.join()
+    if erro_carregamento is not None:
+        print(f"Erro: {erro_carregamento}")
+        exit()
 
 # 2. Função para buscar a linha mais similar
-def buscar_mais_similar(consulta, k=10):
+def buscar_mais_similar(consulta, k=10, filtros=None):
     """
-    Busca as k linhas mais similares à consulta no ChromaDB
+    Busca as k linhas mais similares à consulta no índice configurado
     
     Args:
         consulta (str): Texto para buscar similaridade
         k (int): Número de resultados a retornar
+        filtros (dict): Filtros opcionais, ex.: {"Estrato": ["A1", "A2"], "Área de Avaliação": "MEDICINA I"}
     
     Returns:
         Lista de dicionários com os resultados
     """
-    results = vectorstore.similarity_search_with_score(consulta, k=k)
-    
-    output = []
-    for doc, score in results:
-        output.append({
-            "Título": doc.metadata.get("Título", "N/A"),
-            "Área de Avaliação": doc.metadata.get("Área de Avaliação", "N/A"),
-            "ISSN": doc.metadata.get("ISSN", "N/A"),  # <--- ADD THIS LINE
-            "Estrato": doc.metadata.get("Estrato", "N/A"), # <--- AND THIS LINE IF YOU WANT ESTRATO
-            "Texto Combinado": doc.page_content,
-            "Score de Similaridade": float(score)
-        })
+    aguardar_carregamento()
+    exatos = indice_exato.buscar(consulta, buscador, k, filtros) if indice_exato is not None else []
+    # Um ISSN identifica o periódico; um título exato vem primeiro, completado pela busca semântica
+    if exatos and normalizar_issn(consulta) is not None:
+        return exatos
     
-    return output
+    vetor = embedding_function.encode([consulta])
+    return completar_com_exatos(exatos, buscador.buscar(vetor, k, filtros)[0], k)
+
+def separar_filtros(texto):
+    """
+    Separa a consulta dos filtros digitados no formato "consulta | estrato=A1,A2 | area=MEDICINA I"
+    """
+    partes = [parte.strip() for parte in texto.split("|")]
+    campos = {"estrato": "Estrato", "area": "Área de Avaliação"}
+    filtros = {}
+    for parte in partes[1:]:
+        nome, _, valores = parte.partition("=")
+        campo = campos.get(nome.strip().lower())
+        if campo is None:
+            raise ValueError(f"filtro desconhecido '{nome.strip()}' (use estrato= ou area=)")
+        filtros[campo] = [valor.strip() for valor in valores.split(",") if valor.strip()]
+    return partes[0], filtros
 
 # 3. Interface para o usuário
 print("\nBem-vindo ao buscador de similaridade do dataset Sucupira!")
 print("Digite sua consulta (ou 'sair' para terminar):")
+print("Para filtrar, use: consulta | estrato=A1,A2 | area=MEDICINA I")
 
 while True:
     consulta = input("\nConsulta: ").strip()
@@ -66,7 +104,8 @@ while True:
         continue
     
     try:
-        resultados = buscar_mais_similar(consulta)
+        consulta, filtros = separar_filtros(consulta)
+        resultados = buscar_mais_similar(consulta, filtros=filtros)
         
         if resultados:
             print(f"\nOs resultados mais similares para '{consulta}':")
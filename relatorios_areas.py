@@ -0,0 +1,170 @@
+import pandas as pd
+from cliente_crossref import limites_crossref
+from cache_consultas import normalizar_consulta
+import argparse
+import multiprocessing
+import os
+import re
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# --- Configurações ---
+# Nome do arquivo CSV de entrada (de onde vêm as áreas de avaliação)
+input_csv_file = 'sucupira.csv'
+# Diretório onde cada relatório é gravado assim que fica pronto
+diretorio_relatorios = "./relatorios"
+# Número de periódicos em cada relatório
+k_padrao = 10
+# Linhas do CSV lidas por vez ao listar as áreas
+tamanho_bloco_csv = 100000
+
+# Ferramentas de cada processo do pool, criadas uma única vez em iniciar_processo
+ferramentas = None
+
+
+def listar_areas(caminho):
+    """
+    Lista as Áreas de Avaliação distintas do CSV, em ordem alfabética
+    """
+    try:
+        leitor = pd.read_csv(caminho, usecols=['Área de Avaliação'], dtype=str, chunksize=tamanho_bloco_csv)
+    except FileNotFoundError:
+        print(f"Erro: O arquivo '{caminho}' não foi encontrado. Por favor, verifique o caminho.")
+        exit()
+
+    areas = set()
+    with leitor:
+        for bloco in leitor:
+            areas.update(bloco['Área de Avaliação'].dropna().str.strip())
+    return sorted(area for area in areas if area)
+
+
+def nome_arquivo(area):
+    """
+    Nome do arquivo de relatório da área (sem acentos, espaços ou pontuação)
+    """
+    return re.sub(r'[^a-z0-9]+', '_', normalizar_consulta(area)).strip('_') + ".txt"
+
+
+def aquecer_cache_embeddings(areas):
+    """
+    Codifica todas as consultas de uma vez no processo principal
+
+    Os vetores vão para o cache de embeddings em disco; os processos do pool os
+    encontram lá e nunca precisam carregar o SentenceTransformer.
+    """
+    from periodicos import embedding_model_name, cache_dir, modo_codificador
+    from cache_embeddings import EmbeddingsComCache
+
+    embeddings = EmbeddingsComCache(embedding_model_name, cache_dir, modo_codificador)
+    embeddings.encode(areas)
+    return embeddings.cache.faltas
+
+
+def iniciar_processo(taxa_crossref, semaforo_crossref, backend):
+    """
+    Cria as ferramentas (índice, cache de embeddings e cliente Crossref) uma vez por processo
+    """
+    global ferramentas
+    from periodicos import criar_ferramentas
+    ferramentas = criar_ferramentas(taxa_crossref, semaforo_crossref, backend)
+    # O índice é carregado aqui para que a latência de cada área não inclua a carga
+    ferramentas[0].carregar()
+
+
+def gerar_relatorio(area, k, diretorio):
+    """
+    Executa a busca e a consulta ao Crossref de uma área e grava o relatório
+
+    Returns:
+        Tupla (área, caminho do relatório, segundos gastos)
+    """
+    from periodicos import executar_pipeline
+
+    inicio = time.perf_counter()
+    search_tool, info_tool = ferramentas
+    relatorio = executar_pipeline(search_tool, info_tool, area, k, consultas=[area],
+                                  filtros={"Área de Avaliação": [area]})
+    caminho = os.path.join(diretorio, nome_arquivo(area))
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(relatorio + "\n")
+    return area, caminho, time.perf_counter() - inicio
+
+
+def executar(areas, k=k_padrao, processos=None, diretorio=diretorio_relatorios, backend=None):
+    """
+    Gera os relatórios das áreas em paralelo, gravando cada um assim que fica pronto
+
+    O limite de requisições por segundo ao Crossref é dividido entre os processos, e um
+    semáforo compartilhado mantém o total de requisições simultâneas dentro do limite de
+    um único cliente. Os processos compartilham o cache em disco das respostas.
+
+    Args:
+        backend (str): Backend de busca dos processos (None = o configurado em periodicos.py)
+
+    Returns:
+        Dicionário área -> segundos gastos
+    """
+    if not areas:
+        return {}
+    import periodicos
+    backend = backend or periodicos.backend
+    # Limites do pool do Crossref (o "polite pool" só vale com crossref_mailto configurado)
+    taxa_crossref, simultaneas_crossref = limites_crossref(periodicos.crossref_mailto)
+    os.makedirs(diretorio, exist_ok=True)
+    processos = min(processos or os.cpu_count() or 1, len(areas))
+    faltas = aquecer_cache_embeddings(areas)
+    print(f"{len(areas)} áreas, {processos} processos ({faltas} consultas codificadas pelo modelo).")
+
+    latencias = {}
+    # "spawn" evita herdar threads e conexões (PyTorch, SQLite, ChromaDB) do processo principal
+    contexto = multiprocessing.get_context("spawn")
+    semaforo_crossref = contexto.BoundedSemaphore(simultaneas_crossref)
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto, initializer=iniciar_processo,
+                             initargs=(taxa_crossref / processos, semaforo_crossref, backend)) as executor:
+        futuros = {executor.submit(gerar_relatorio, area, k, diretorio): area for area in areas}
+        for futuro in as_completed(futuros):
+            try:
+                area, caminho, segundos = futuro.result()
+            except Exception as e:
+                print(f"[{len(latencias)}/{len(areas)}] Erro em '{futuros[futuro]}': {e}")
+                continue
+            latencias[area] = segundos
+            print(f"[{len(latencias)}/{len(areas)}] {area}: {segundos:.2f}s -> {caminho}")
+    return latencias
+
+
+def resumir_latencias(latencias, total):
+    """
+    Mostra a vazão total e a latência de cada área
+    """
+    if not latencias:
+        print("Nenhum relatório gerado.")
+        return
+    valores = sorted(latencias.values())
+    print(f"\n{len(latencias)} relatórios em {total:.1f}s ({len(latencias) / total:.2f} áreas/s)")
+    print(f"Latência por área: mediana {statistics.median(valores):.2f}s | "
+          f"média {statistics.fmean(valores):.2f}s | máxima {valores[-1]:.2f}s")
+    for area, segundos in sorted(latencias.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {segundos:7.2f}s  {area}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera relatórios de periódicos (busca + Crossref) para várias áreas em paralelo.")
+    parser.add_argument('areas', nargs='*',
+                        help="Áreas a processar (padrão: todas as Áreas de Avaliação distintas do CSV).")
+    parser.add_argument('--csv', default=input_csv_file, help=f"Arquivo CSV de onde vêm as áreas (padrão: {input_csv_file}).")
+    parser.add_argument('--saida', default=diretorio_relatorios,
+                        help=f"Diretório dos relatórios, um arquivo por área (padrão: {diretorio_relatorios}).")
+    parser.add_argument('-k', type=int, default=k_padrao, help=f"Número de periódicos por relatório (padrão: {k_padrao}).")
+    parser.add_argument('--processos', type=int, default=None, help="Processos em paralelo (padrão: um por CPU).")
+    parser.add_argument('--backend', choices=["chroma", "numpy", "shards"], default=None,
+                        help="Backend de busca (padrão: o configurado em periodicos.py). Com 'numpy' ou 'shards' "
+                             "os processos leem a mesma matriz em memory-map em vez de abrir um índice cada.")
+    args = parser.parse_args()
+
+    areas = args.areas or listar_areas(args.csv)
+    inicio = time.perf_counter()
+    latencias = executar(areas, args.k, args.processos, args.saida, args.backend)
+    resumir_latencias(latencias, time.perf_counter() - inicio)
@@ -0,0 +1,91 @@
+from busca import valores_campo
+import json
+import math
+import re
+
+# --- Configurações ---
+# Casas decimais do score de similaridade na saída compacta
+casas_score = 2
+
+
+def estimar_tokens(texto):
+    """
+    Estima quantos tokens o texto ocupa no contexto do LLM, sem depender do tokenizer do modelo
+
+    Conta cada sequência de pontuação como um token e cada palavra como um token a
+    cada 4 caracteres, uma aproximação próxima à dos tokenizers BPE usuais.
+    """
+    return sum(math.ceil(len(parte) / 4) if parte[0].isalnum() or parte[0] == '_' else 1
+               for parte in re.findall(r"\w+|[^\w\s]+", str(texto)))
+
+
+def _linha(dados):
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+
+
+def _montar_busca(secoes, profundidade):
+    areas = {}
+    corpo = []
+    enriquecido = False
+    for titulo, resultados in secoes:
+        if titulo is not None:
+            corpo.append(f"# {titulo}")
+        for res in resultados[:profundidade]:
+            ids = [areas.setdefault(area, len(areas)) for area in valores_campo(res["Evaluation Area"])]
+            linha = {"t": res["Title"], "i": res["ISSN"], "q": res["Qualis Rating"],
+                     "a": ids[0] if len(ids) == 1 else ids, "s": round(float(res["Similarity Score"]), casas_score)}
+            if "Publisher" in res:
+                enriquecido = True
+                linha.update({"p": res["Publisher"], "n": [res["Total Articles"], res["Active Articles"]]})
+            corpo.append(_linha(linha))
+    campos = "campos: t=título i=ISSN q=Qualis a=área s=distância (menor=mais similar)"
+    if enriquecido:
+        campos += " p=editora n=[artigos,ativos]"
+    cabecalho = [campos, "áreas: " + " | ".join(f"{i}={area}" for area, i in areas.items())]
+    return "\n".join(cabecalho + corpo)
+
+
+def formatar_busca_compacta(secoes, orcamento_tokens=None):
+    """
+    Formata os resultados do Journal Search em JSON lines com chaves curtas
+
+    As áreas aparecem uma única vez, em um dicionário no cabeçalho, e cada linha
+    guarda só o número da área. Com 'orcamento_tokens', as linhas de menor posição
+    de cada seção são removidas até a saída caber no orçamento.
+
+    Args:
+        secoes: Lista de (título da seção ou None, lista de resultados de BuscaPeriodicos)
+        orcamento_tokens (int): Máximo de tokens estimados da saída (None = sem limite)
+
+    Returns:
+        Texto da saída
+    """
+    profundidade = max((len(resultados) for _, resultados in secoes), default=0)
+    saida = _montar_busca(secoes, profundidade)
+    while orcamento_tokens and profundidade > 1 and estimar_tokens(saida) > orcamento_tokens:
+        profundidade -= 1
+        saida = _montar_busca(secoes, profundidade)
+
+    omitidas = sum(max(len(resultados) - profundidade, 0) for _, resultados in secoes)
+    if omitidas:
+        saida += f"\n({omitidas} resultados de menor similaridade omitidos pelo limite de tokens)"
+    return saida
+
+
+def formatar_info_compacta(respostas):
+    """
+    Formata as respostas do Crossref do Journal Information em JSON lines com chaves curtas
+
+    Args:
+        respostas: Lista de (ISSN, status, dados) na ordem pedida
+    """
+    linhas = ["campos: i=ISSN t=título p=editora n=total de artigos at=artigos ativos"]
+    for issn, status, dados in respostas:
+        if status is None:
+            linhas.append(_linha({"i": issn, "erro": str(dados)}))
+        elif status == 404:
+            linhas.append(_linha({"i": issn, "erro": "não encontrado no Crossref"}))
+        else:
+            linhas.append(_linha({"i": issn, "t": dados["title"], "p": dados["publisher"],
+                                  "n": dados["total_articles"], "at": dados["active_articles"]}))
+    return "\n".join(linhas)
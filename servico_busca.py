@@ -0,0 +1,211 @@
+from aiohttp import web
+from busca import chave_filtros
+from periodicos import criar_ferramentas, mesclar_por_issn
+import argparse
+import asyncio
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configurações ---
+# Endereço e porta do serviço
+host_padrao = "127.0.0.1"
+porta_padrao = 8765
+# Tempo (segundos) que o primeiro pedido de um lote espera por outros antes da codificação
+janela_lote = 0.005
+# Quantidade máxima de consultas codificadas juntas
+max_lote = 64
+# Threads que consultam o Crossref em /journal/{issn}
+threads_crossref = 8
+
+json_dumps = functools.partial(json.dumps, ensure_ascii=False, default=float)
+
+
+class AgrupadorConsultas:
+    """
+    Agrupa consultas que chegam juntas em uma única chamada a BuscaPeriodicos.buscar_lote
+
+    O primeiro pedido abre uma janela de alguns milissegundos; os pedidos que chegam
+    nela (até max_lote) são codificados em um único encode e buscados no índice em
+    uma única chamada. Os lotes rodam em uma única thread, então o modelo, o índice
+    e os caches nunca são usados por duas threads ao mesmo tempo.
+    """
+
+    def __init__(self, search_tool, janela=janela_lote, tamanho_maximo=max_lote):
+        self.search_tool = search_tool
+        self.janela = janela
+        self.tamanho_maximo = tamanho_maximo
+        self.lotes = 0
+        self.consultas = 0
+        self._fila = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="busca")
+        self._tarefa = None
+
+    def iniciar(self):
+        self._tarefa = asyncio.create_task(self._processar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def buscar(self, query, k=5, filtros=None):
+        """
+        Agenda uma consulta no próximo lote e devolve seus resultados
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((query, k, filtros, futuro))
+        return await futuro
+
+    async def _processar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pedidos = [await self._fila.get()]
+            limite = loop.time() + self.janela
+            while len(pedidos) < self.tamanho_maximo:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    pedidos.append(await asyncio.wait_for(self._fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            # buscar_lote recebe um único k e um único filtro, então o lote é dividido por eles
+            grupos = {}
+            for pedido in pedidos:
+                grupos.setdefault((pedido[1], chave_filtros(pedido[2])), []).append(pedido)
+            for (k, _), grupo in grupos.items():
+                queries = [pedido[0] for pedido in grupo]
+                try:
+                    resultados = await loop.run_in_executor(
+                        self._executor, functools.partial(self.search_tool.buscar_lote, queries, k, filtros=grupo[0][2])
+                    )
+                except Exception as e:
+                    resultados = [e] * len(grupo)
+                for (_, _, _, futuro), resultado in zip(grupo, resultados):
+                    if futuro.done():
+                        continue  # Cliente desconectou
+                    if isinstance(resultado, Exception):
+                        futuro.set_exception(resultado)
+                    else:
+                        futuro.set_result(resultado)
+                self.lotes += 1
+                self.consultas += len(grupo)
+
+
+def ler_filtros(dados):
+    """
+    Monta os filtros da busca a partir dos parâmetros 'estrato' e 'area_avaliacao'
+    """
+    return {"Estrato": dados.get("estrato"), "Área de Avaliação": dados.get("area_avaliacao")}
+
+
+def resposta_json(dados, status=200):
+    return web.json_response(dados, status=status, dumps=json_dumps)
+
+
+async def rota_search(request):
+    """
+    GET /search?q=...&k=5&estrato=A1&estrato=A2&area_avaliacao=MEDICINA I
+    """
+    query = request.query.get("q", "").strip()
+    if not query:
+        return resposta_json({"erro": "parâmetro 'q' ausente"}, 400)
+    try:
+        k = int(request.query.get("k", 5))
+        filtros = ler_filtros({campo: request.query.getall(campo, None) for campo in ("estrato", "area_avaliacao")})
+        resultados = await request.app["agrupador"].buscar(query, k, filtros)
+    except ValueError as e:
+        return resposta_json({"erro": str(e)}, 400)
+    return resposta_json({"query": query, "resultados": resultados})
+
+
+async def rota_search_batch(request):
+    """
+    POST /search_batch com {"queries": [...], "k": 5, "merge": false, "estrato": [...], "area_avaliacao": [...]}
+    """
+    try:
+        dados = await request.json()
+        queries = [q for q in dados.get("queries", []) if str(q).strip()]
+        k = int(dados.get("k", 5))
+        filtros = ler_filtros(dados)
+        agrupador = request.app["agrupador"]
+        resultados = await asyncio.gather(*(agrupador.buscar(query, k, filtros) for query in queries))
+    except (ValueError, AttributeError) as e:
+        return resposta_json({"erro": str(e)}, 400)
+    if dados.get("merge"):
+        return resposta_json({"queries": queries, "resultados": mesclar_por_issn(resultados)})
+    return resposta_json({"queries": queries, "resultados": list(resultados)})
+
+
+async def rota_journal(request):
+    """
+    GET /journal/{issn}: dados do periódico no Crossref (do cache, quando disponível)
+    """
+    issn = request.match_info["issn"]
+    cliente = request.app["info_tool"].cliente
+    loop = asyncio.get_running_loop()
+    resposta = await loop.run_in_executor(request.app["executor_crossref"], cliente.buscar_lote, [issn])
+    status, dados = resposta[issn]
+    if status is None:
+        return resposta_json({"issn": issn, "erro": dados}, 502)
+    if status == 404:
+        return resposta_json({"issn": issn, "erro": "ISSN não encontrado no Crossref"}, 404)
+    return resposta_json({"issn": issn, **dados})
+
+
+async def rota_estatisticas(request):
+    agrupador = request.app["agrupador"]
+    return resposta_json({
+        "lotes": agrupador.lotes,
+        "consultas": agrupador.consultas,
+        "consultas_por_lote": agrupador.consultas / agrupador.lotes if agrupador.lotes else 0.0,
+        "cache": request.app["search_tool"].estatisticas_cache()
+    })
+
+
+def criar_app(search_tool, info_tool, janela=janela_lote, tamanho_maximo=max_lote):
+    """
+    Cria a aplicação aiohttp com as rotas do serviço de busca
+    """
+    app = web.Application()
+    app["search_tool"] = search_tool
+    app["info_tool"] = info_tool
+
+    async def iniciar(app):
+        app["agrupador"] = AgrupadorConsultas(search_tool, janela, tamanho_maximo)
+        app["agrupador"].iniciar()
+        app["executor_crossref"] = ThreadPoolExecutor(max_workers=threads_crossref, thread_name_prefix="crossref")
+
+    async def encerrar(app):
+        await app["agrupador"].parar()
+        app["executor_crossref"].shutdown(wait=False)
+
+    app.on_startup.append(iniciar)
+    app.on_cleanup.append(encerrar)
+    app.router.add_get("/search", rota_search)
+    app.router.add_post("/search_batch", rota_search_batch)
+    app.router.add_get("/journal/{issn}", rota_journal)
+    app.router.add_get("/stats", rota_estatisticas)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP local de busca de periódicos (modelo e índice carregados uma única vez).")
+    parser.add_argument('--host', default=host_padrao, help=f"Endereço do serviço (padrão: {host_padrao}).")
+    parser.add_argument('--porta', type=int, default=porta_padrao, help=f"Porta do serviço (padrão: {porta_padrao}).")
+    parser.add_argument('--janela-ms', type=float, default=janela_lote * 1000,
+                        help=f"Espera (ms) para agrupar consultas simultâneas em um lote (padrão: {janela_lote * 1000:g}).")
+    parser.add_argument('--max-lote', type=int, default=max_lote, help=f"Consultas por lote (padrão: {max_lote}).")
+    args = parser.parse_args()
+
+    # Sem antecipação: cada /search não deve gerar consultas ao Crossref que ninguém pediu
+    search_tool, info_tool = criar_ferramentas(antecipar=False)
+    # Carrega o índice e o modelo antes de aceitar conexões, para que a primeira consulta não pague o carregamento
+    search_tool.carregar()
+    search_tool.embedding_function.model
+
+    print(f"Serviço de busca em http://{args.host}:{args.porta}")
+    web.run_app(criar_app(search_tool, info_tool, args.janela_ms / 1000, args.max_lote),
+                host=args.host, port=args.porta, print=None)
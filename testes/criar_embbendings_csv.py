@@ -1,6 +1,17 @@
 import pandas as pd
 from sentence_transformers import SentenceTransformer
 import numpy as np # Importar numpy
+import os
+import sys
+import time
+
+# Permite importar os módulos da raiz do projeto (o script é executado de dentro de testes/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache_embeddings import EmbeddingCache
+from exportacao_embeddings import gravar_exportacao, carregar_exportacao
+
+# Tipo dos valores da matriz exportada ('float32' ou 'float16', metade do tamanho)
+dtype_exportacao = 'float32'
 
 # 1. Carregar o arquivo CSV
 # Suponha que seu CSV se chame 'dados.csv' e tenha as colunas 'titulo' e 'descricao'
@@ -22,30 +33,33 @@ print("Modelo carregado com sucesso!")
 
 # 4. Gerar os embeddings
 print("Gerando os embeddings. Aguarde...")
-embeddings = model.encode(df['texto_combinado'].tolist(), show_progress_bar=True)
+# Textos já codificados antes (por este script ou pelo criar_embbendings_chroma.py) vêm do cache
+cache = EmbeddingCache('paraphrase-MiniLM-L6-v2', '../cache_embeddings')
+embeddings = cache.obter(df['texto_combinado'].tolist(), lambda textos: model.encode(textos, show_progress_bar=True))
 print("Embeddings gerados!")
 
-# 5. Adicionar os embeddings de volta ao DataFrame (opcional, mas útil)
-df['embedding'] = embeddings.tolist()
-
-# 6. Exibir os primeiros resultados e a forma dos embeddings
-print("\nPrimeiras linhas do DataFrame com embeddings:")
+# 5. Exibir os primeiros resultados e a forma dos embeddings
+print("\nPrimeiras linhas do DataFrame:")
 print(df.head())
 
 print(f"\nForma dos embeddings gerados: {embeddings.shape}")
-print(f"Um exemplo de embedding (primeira linha): {df['embedding'].iloc[0][:10]}...")
-print(f"Tipo de dado de um embedding: {type(df['embedding'].iloc[0])}")
-
-# --- NOVAS SEÇÕES PARA SALVAR OS EMBEDDINGS ---
+print(f"Um exemplo de embedding (primeira linha): {embeddings[0][:10]}...")
+print(f"Tipo de dado dos embeddings: {embeddings.dtype}")
 
-output_csv_with_embeddings = '../sucupira_com_embeddings.csv'
+# --- SALVAR OS EMBEDDINGS ---
 
-# Salvar o DataFrame completo com as colunas originais e a nova coluna 'embedding'
-# index=False evita que o Pandas escreva o índice do DataFrame como uma coluna.
-df.to_csv(output_csv_with_embeddings, index=False)
+# Os vetores vão para uma matriz binária (.npy), no mesmo formato do backend de busca NumPy,
+# e as colunas originais para uma tabela Parquet, alinhadas linha a linha, em vez de listas
+# de floats convertidas em texto no CSV
+output_dir_with_embeddings = '../sucupira_embeddings'
+gravar_exportacao(df, embeddings, output_dir_with_embeddings, dtype_exportacao, 'paraphrase-MiniLM-L6-v2')
 
-print(f"\nDataFrame completo (incluindo todas as colunas originais e a nova coluna 'embedding') salvo em '{output_csv_with_embeddings}'")
+tamanho = sum(os.path.getsize(os.path.join(output_dir_with_embeddings, arquivo))
+              for arquivo in os.listdir(output_dir_with_embeddings))
+print(f"\nEmbeddings ({dtype_exportacao}) e metadados salvos em '{output_dir_with_embeddings}' ({tamanho / 1e6:.1f} MB)")
 
-# Se você quisesse apenas os embeddings em um CSV, um por linha:
-# np.savetxt('embeddings_apenas.csv', embeddings, delimiter=',')
-# print(f"Embeddings (apenas os vetores) salvos em 'embeddings_apenas.csv' (formato CSV)")
\ No newline at end of file
+# Leitura de volta: a matriz é aberta por memory-map, sem converter texto em floats
+inicio = time.perf_counter()
+metadados, matriz, _ = carregar_exportacao(output_dir_with_embeddings)
+print(f"Exportação carregada em {(time.perf_counter() - inicio) * 1000:.1f} ms: "
+      f"{len(metadados)} linhas, matriz {matriz.shape} {matriz.dtype}")
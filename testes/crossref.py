@@ -1,21 +1,28 @@
 import requests
+import os
+import sys
+
+# Permite importar os módulos da raiz do projeto (o script é executado de dentro de testes/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cliente_crossref import CacheCrossref, ClienteCrossref
+
+# Respostas ficam em cache no mesmo arquivo usado pelo periodicos.py
+cliente = ClienteCrossref(CacheCrossref('../cache_crossref.sqlite3'), timeout=10)  # Timeout de 10 segundos
 
 def get_journal_info(issn):
-    url = f"https://api.crossref.org/journals/{issn}"
     try:
-        response = requests.get(url, timeout=10)  # Timeout de 10 segundos
-        response.raise_for_status()  # Levanta exceção para erros HTTP
-        data = response.json()
+        status, info = cliente.buscar(issn)
+        if status == 404:
+            return {"error": f"ISSN {issn} não encontrado no Crossref", "status_code": 404}
         
         # Extrai os campos com tratamento para chaves ausentes
-        message = data.get("message", {})
         journal_info = {
-            "title": message.get("title", "Não disponível"),
-            "publisher": message.get("publisher", "Não disponível"),
-            "ISSN": message.get("ISSN", []),
+            "title": info["title"],
+            "publisher": info["publisher"],
+            "ISSN": info["ISSN"],
             "counts": {
-                "total_dois": message.get("counts", {}).get("total-dois", 0),  # Número total de artigos
-                "current_dois": message.get("counts", {}).get("current-dois", 0)  # Artigos ativos
+                "total_dois": info["total_articles"],  # Número total de artigos
+                "current_dois": info["active_articles"]  # Artigos ativos
             }
         }
         return journal_info